@@ -0,0 +1,332 @@
+import os
+import sys
+import gc
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+import numpy as np
+import pandas as pd
+from sqlite_backend import SQLiteClient, SQLiteQuery, SQLiteRPC
+
+# Benchmarks of the form, submission, collation and compiler-page hot paths, run
+# in-process against a temporary SQLite store that counts every request sent.
+#
+#   python benchmark.py run -o baseline.json
+#   python benchmark.py compare baseline.json current.json
+
+COLLATION_YEARS = (1995, 2024)
+COLLATION_ROWS_PER_YEAR = 20
+PENDING_ROWS = 50
+SUBMIT_SIZES = (1, 1000, 10000)
+RENDER_FORMS = {
+    "4D1": ("4D1_Domestic_Wastewater_Treatment.yaml", "waste_form"),
+    "4D2": ("4D2_Industrial_Wastewater_Treatment.yaml", "waste_form"),
+    "2A3": ("2A3_glass.yaml", "ippu_form"),
+}
+RENDER_TABLE_ROWS = 100
+DEFAULT_THRESHOLD = 0.25
+# Slowdowns smaller than this are timer noise, whatever their ratio
+MIN_REGRESSION_S = 0.002
+
+
+class CountingClient(SQLiteClient):
+    """SQLiteClient that counts executed requests, the in-process stand-in for HTTP round trips."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.round_trips = 0
+        self._count_lock = threading.Lock()
+
+    def _count(self):
+        with self._count_lock:
+            self.round_trips += 1
+
+    def table(self, name):
+        return _CountingQuery(self, name)
+
+    def rpc(self, name, params=None):
+        return _CountingRPC(self, name, params)
+
+
+class _CountingQuery(SQLiteQuery):
+    def execute(self):
+        self.client._count()
+        return super().execute()
+
+
+class _CountingRPC(SQLiteRPC):
+    def execute(self):
+        self.client._count()
+        return super().execute()
+
+
+@dataclass(frozen=True, slots=True)
+class Benchmark:
+    name: str
+    run: Callable[[Any], Any]
+    setup: Optional[Callable[[CountingClient], Any]] = None
+    cold: bool = True  # clear the shared caches before every run
+
+
+def _clear_caches():
+    from query_cache import query_cache
+    import data_collation_view
+    import dashboards
+    query_cache.clear()
+    with data_collation_view._pivot_lock:
+        data_collation_view._pivot_cache.clear()
+    dashboards._chart_cache.clear()
+
+
+# --- Data ---
+def seed(client, years=COLLATION_YEARS, rows_per_year=COLLATION_ROWS_PER_YEAR, pending_rows=PENDING_ROWS, seed_value=0):
+    """Fill every IPPU validated table with rows_per_year rows for each year, and each validation table with pending rows."""
+    import ippu_catalog
+    rng = np.random.default_rng(seed_value)
+    year_values = np.repeat(np.arange(years[0], years[1] + 1), rows_per_year)
+    for subcategory, category in ippu_catalog.CATEGORIES.items():
+        columns = ippu_catalog.activity_columns(subcategory)
+        values = pd.DataFrame(rng.gamma(2.0, 500.0, size=(len(year_values), len(columns))).round(2), columns=columns)
+        validated = values.assign(data_year=year_values)
+        client.table(category["validated"]).insert(validated.to_dict("records")).execute()
+        pending = values.head(pending_rows).assign(
+            data_year=years[1], status="Pending", submission_date="2024-01-01T00:00:00", ippu_subcategory=subcategory
+        )
+        client.table(category["validation"]).insert(pending.to_dict("records")).execute()
+
+
+# --- Forms ---
+def _render_setup(form):
+    def setup(client):
+        import form_registry
+        file_name, module = RENDER_FORMS[form]
+        schema = form_registry.get_form(file_name, key_prefix=form_registry.make_key_prefix(file_name[:-5]))
+        if schema is None:
+            raise RuntimeError(f"Form {file_name} did not load: {form_registry.get_load_errors()}")
+        return __import__(module), schema
+    return setup
+
+
+def _render(state):
+    module, schema = state
+    form_data = {}
+    for table in schema.tables:
+        form_data[f"{schema.key_prefix}{table.name}_data"] = [
+            {col.name: i for col in table.columns} for i in range(RENDER_TABLE_ROWS)
+        ]
+    for field in schema.fields:
+        module.render_field(field, form_data, key_prefix=schema.key_prefix)
+    for table in schema.tables:
+        module.render_table(table, form_data, key_prefix=schema.key_prefix)
+    for field in schema.fields_after_tables:
+        module.render_field(field, form_data, key_prefix=schema.key_prefix)
+
+
+def _submit_setup(rows):
+    def setup(client):
+        import form_registry
+        schema = form_registry.get_subcategory_form("index.yaml", "2A3 - Glass Production")
+        prefix = schema.key_prefix
+        form_data = {
+            "data_year": [2023],
+            "name": "Benchmark",
+            f"{prefix}mass_glass_produced_tonnes": 125000.0,
+            f"{prefix}mass_glass_produced_tonnes_unit": "kg",
+            f"{prefix}glass_production_types_data": [
+                {"glass_type": f"Type {i % 7}", "amount": float(i)} for i in range(rows)
+            ],
+        }
+        return client, schema, form_data
+    return setup
+
+
+def _submit(state):
+    import ippu_form
+    client, schema, form_data = state
+    if not ippu_form.submit_subcategory_data(schema.name, form_data, schema, client):
+        raise RuntimeError("Submission failed")
+
+
+# --- Compiler views ---
+def _collation(client):
+    from data_collation_view import data_collation_view
+    collated = data_collation_view(client, COLLATION_YEARS)
+    if collated.empty:
+        raise RuntimeError("Collation returned no rows")
+
+
+def _page_setup(view):
+    def setup(client):
+        from streamlit.testing.v1 import AppTest
+        import ippu_view
+        ippu_view.get_supabase_client = lambda: client
+        return AppTest.from_function(_page, default_timeout=300), view
+    return setup
+
+
+def _page():
+    from ippu_view import ippu_view_page
+    ippu_view_page()
+
+
+def _page_run(state):
+    app, view = state
+    app.session_state["ippu_view"] = view
+    app.run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+
+
+def benchmarks():
+    suite = [Benchmark(f"render_form[{form}]", _render, _render_setup(form), cold=False) for form in RENDER_FORMS]
+    suite += [Benchmark(f"submit[{rows} rows]", _submit, _submit_setup(rows)) for rows in SUBMIT_SIZES]
+    years = COLLATION_YEARS[1] - COLLATION_YEARS[0] + 1
+    suite += [
+        Benchmark(f"collation[{years}y x 8 tables, cold]", _collation),
+        Benchmark(f"collation[{years}y x 8 tables, warm]", _collation, cold=False),
+        Benchmark("ippu_view_page[overview, cold]", _page_run, _page_setup("📊 Overview")),
+        Benchmark("ippu_view_page[overview, warm]", _page_run, _page_setup("📊 Overview"), cold=False),
+        Benchmark("ippu_view_page[subcategory, cold]", _page_run, _page_setup("📂 Subcategory View")),
+    ]
+    return suite
+
+
+# --- Running ---
+def measure(benchmark, client, repeat):
+    """Time repeat runs, then trace one more for allocations and round trips."""
+    state = benchmark.setup(client) if benchmark.setup else client
+    # Warm-up: imports and first-use setup are not part of any timed run, and warm runs find the caches filled
+    benchmark.run(state)
+    times = []
+    for _ in range(repeat):
+        if benchmark.cold:
+            _clear_caches()
+        gc.collect()
+        start = time.perf_counter()
+        benchmark.run(state)
+        times.append(time.perf_counter() - start)
+
+    if benchmark.cold:
+        _clear_caches()
+    gc.collect()
+    client.round_trips = 0
+    tracemalloc.start()
+    try:
+        benchmark.run(state)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "wall_s": statistics.median(times),
+        "wall_min_s": min(times),
+        "runs": repeat,
+        "alloc_peak_bytes": peak,
+        "alloc_retained_bytes": current,
+        "round_trips": client.round_trips,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(repeat, only=None):
+    workdir = tempfile.mkdtemp(prefix="ghg-bench-")
+    try:
+        client = CountingClient(os.path.join(workdir, "bench.sqlite3"))
+        seed(client)
+        results = {}
+        for benchmark in benchmarks():
+            if only and not any(part in benchmark.name for part in only):
+                continue
+            results[benchmark.name] = measure(benchmark, client, repeat)
+            result = results[benchmark.name]
+            print(f"{benchmark.name:45} {result['wall_s'] * 1000:10.1f} ms {result['alloc_peak_bytes'] / 1e6:9.1f} MB {result['round_trips']:7} trips", flush=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "commit": _git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Print each benchmark's change and return the names that regressed beyond threshold."""
+    regressions = []
+    print(f"{'benchmark':45} {'base ms':>10} {'new ms':>10} {'change':>8} {'peak MB':>9} {'trips':>11}")
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"{name:45} {'-':>10} {new['wall_s'] * 1000:10.1f}      new")
+            continue
+        change = new["wall_s"] / old["wall_s"] - 1 if old["wall_s"] else 0.0
+        slower = change > threshold and new["wall_s"] - old["wall_s"] > MIN_REGRESSION_S
+        more_memory = new["alloc_peak_bytes"] > old["alloc_peak_bytes"] * (1 + threshold)
+        more_trips = new["round_trips"] > old["round_trips"]
+        flag = " REGRESSED" if slower or more_memory or more_trips else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:45} {old['wall_s'] * 1000:10.1f} {new['wall_s'] * 1000:10.1f} {change:+8.0%} "
+              f"{new['alloc_peak_bytes'] / 1e6:9.1f} {old['round_trips']:>5}->{new['round_trips']:<5}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the form, submission, collation and compiler-page hot paths.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the suite and optionally save the results as a baseline")
+    run_parser.add_argument("-o", "--output", help="write the results as JSON to this file")
+    run_parser.add_argument("-r", "--repeat", type=int, default=5, help="timed runs per benchmark (default 5)")
+    run_parser.add_argument("-k", "--only", action="append", help="only run benchmarks whose name contains this text")
+    run_parser.add_argument("--compare", help="baseline JSON to compare the new results against")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown before a regression is reported")
+    compare_parser = commands.add_parser("compare", help="compare two saved result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown before a regression is reported")
+    args = parser.parse_args(argv)
+
+    # The suite measures the code, not its logging or Streamlit's bare-mode warnings
+    logging.disable(logging.WARNING)
+
+    if args.command == "run":
+        current = run(args.repeat, args.only)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(current, f, indent=2)
+        baseline_path = args.compare
+    else:
+        with open(args.current) as f:
+            current = json.load(f)
+        baseline_path = args.baseline
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+import io
+import os
+import logging
+import pandas as pd
+import streamlit as st
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+from openpyxl.worksheet.datavalidation import DataValidation
+from supabase_client import insert_batched, BatchInsertError
+from query_cache import invalidate_tables
+import units
+
+logger = logging.getLogger(__name__)
+
+# Largest upload accepted in one go; larger workbooks should be split
+MAX_UPLOAD_ROWS = int(os.environ.get("BULK_UPLOAD_MAX_ROWS", "50000"))
+DATA_SHEET = "Data"
+MULTISELECT_SEPARATOR = ";"
+
+
+def template_columns(schema):
+    """Return the FieldSpecs a template row holds: the form's fields, then its table columns, without duplicates."""
+    columns = {}
+    for field in schema.all_fields + tuple(col for table in schema.tables for col in table.columns):
+        if field.type != "hidden" and field.name not in columns:
+            columns[field.name] = field
+    return list(columns.values())
+
+
+def _headers(columns):
+    headers = ["data_year"]
+    for col in columns:
+        headers.append(col.name)
+        if col.has_unit_options:
+            headers.append(f"{col.name}_unit")
+    return headers
+
+
+def _describe(col):
+    if col.type in ("select", "radio", "multiselect"):
+        allowed = ", ".join(str(option) for option in col.options)
+        return f"One of: {allowed}" + (f" (several separated by '{MULTISELECT_SEPARATOR}')" if col.type == "multiselect" else "")
+    if col.has_unit_options:
+        return f"Number in {', '.join(col.unit_options)}; stored in {col.required_unit}"
+    return "Number" if col.type == "number" else "Text"
+
+
+def template_csv(schema):
+    """Return an empty CSV template with one column per field (and unit) of the form."""
+    return pd.DataFrame(columns=_headers(template_columns(schema))).to_csv(index=False).encode("utf-8")
+
+
+def template_xlsx(schema):
+    """Return an XLSX template: a Data sheet to fill in and a Fields sheet describing every column."""
+    columns = template_columns(schema)
+    workbook = Workbook()
+    data = workbook.active
+    data.title = DATA_SHEET
+    data.append(_headers(columns))
+    for cell in data[1]:
+        cell.font = Font(bold=True)
+    data.freeze_panes = "A2"
+
+    # Drop-down lists for the option and unit columns; Excel limits an inline list to 255 characters
+    for index, header in enumerate(_headers(columns), start=1):
+        col = next((c for c in columns if header in (c.name, f"{c.name}_unit")), None)
+        if col is None:
+            continue
+        options = col.unit_options if header.endswith("_unit") and header != col.name else (col.options if col.type in ("select", "radio") else ())
+        inline = ",".join(str(option) for option in options)
+        if options and len(inline) <= 253 and not any("," in str(option) for option in options):
+            validation = DataValidation(type="list", formula1=f'"{inline}"', allow_blank=True)
+            letter = data.cell(row=1, column=index).column_letter
+            validation.add(f"{letter}2:{letter}{MAX_UPLOAD_ROWS + 1}")
+            data.add_data_validation(validation)
+
+    fields = workbook.create_sheet("Fields")
+    fields.append(["Column", "Label", "Required", "Values"])
+    fields.append(["data_year", "Data Year", "No", "Year the row reports; defaults to the year chosen in the form"])
+    for col in columns:
+        fields.append([col.name, col.label, "Yes" if col.required else "No", _describe(col)])
+        if col.has_unit_options:
+            fields.append([f"{col.name}_unit", f"Unit of {col.label}", "No", f"One of: {', '.join(col.unit_options)}; defaults to {col.default_unit}"])
+    for cell in fields[1]:
+        cell.font = Font(bold=True)
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+@st.cache_data(show_spinner=False)
+def _template_bytes(kind, path, mtime, _schema):
+    """Template bytes of a form, built once per form file and modification time."""
+    return template_xlsx(_schema) if kind == "xlsx" else template_csv(_schema)
+
+
+def read_upload(uploaded_file):
+    """Read a filled template (XLSX or CSV) into a DataFrame of strings and numbers.
+
+    Workbooks are opened read-only and streamed row by row, so large files are
+    never loaded as a full cell model."""
+    if uploaded_file.name.lower().endswith(".csv"):
+        return pd.read_csv(uploaded_file, dtype=object, skip_blank_lines=True, nrows=MAX_UPLOAD_ROWS + 1)
+    workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        sheet = workbook[DATA_SHEET] if DATA_SHEET in workbook.sheetnames else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        names = [str(name).strip() if name is not None else "" for name in header]
+        records = []
+        for row in rows:
+            if all(value is None or value == "" for value in row):
+                continue
+            records.append(row)
+            if len(records) > MAX_UPLOAD_ROWS:
+                break
+        return pd.DataFrame.from_records(records, columns=names).loc[:, [name for name in names if name]]
+    finally:
+        workbook.close()
+
+
+def validate_upload(schema, df):
+    """Check and convert an uploaded frame column by column.
+
+    Returns (the rows ready to insert, errors). Values are checked one column
+    at a time: numbers are parsed and range-checked, options are matched
+    against the form's choices, required fields must be present, and unit
+    columns are converted to their required units. Rows with any error are
+    left out and reported by spreadsheet row number."""
+    columns = template_columns(schema)
+    by_label = {col.label: col.name for col in columns}
+    df = df.rename(columns=lambda name: by_label.get(name, name))
+    known = {"data_year"} | {header for header in _headers(columns)}
+    errors = []
+    unknown = [name for name in df.columns if name not in known]
+    if unknown:
+        errors.append(f"Ignored columns not in the {schema.name} template: {', '.join(map(str, unknown))}")
+    df = df.loc[:, [name for name in df.columns if name in known]]
+    if len(df) > MAX_UPLOAD_ROWS:
+        errors.append(f"Only the first {MAX_UPLOAD_ROWS} rows were read; split larger files")
+        df = df.iloc[:MAX_UPLOAD_ROWS]
+    if df.empty:
+        return df, errors + ["The file has no data rows."]
+
+    # Spreadsheet row numbers: row 1 is the header
+    df.index = pd.RangeIndex(2, len(df) + 2)
+    bad = pd.Series(False, index=df.index)
+
+    def reject(mask, message):
+        nonlocal bad
+        if mask.any():
+            rows = df.index[mask.to_numpy()]
+            shown = ", ".join(map(str, rows[:10])) + (" …" if len(rows) > 10 else "")
+            errors.append(f"{message} (rows {shown})")
+            bad |= mask
+
+    blank = df.isna() | df.apply(lambda column: column.astype(str).str.strip() == "")
+    if "data_year" in df.columns:
+        years = pd.to_numeric(df["data_year"], errors="coerce")
+        reject(~blank["data_year"] & (years.isna() | (years % 1 != 0)), "data_year must be a whole year")
+        df["data_year"] = years.where(years % 1 == 0).astype("Int64")
+
+    for col in columns:
+        if col.name not in df.columns:
+            if col.required:
+                reject(pd.Series(True, index=df.index), f"Missing required column {col.name}")
+            continue
+        missing = blank[col.name]
+        if col.type in ("select", "radio") and len(col.options) == 1:
+            # Single-choice fields (the category selectors) need not be filled in
+            df[col.name] = df[col.name].where(~missing, col.options[0])
+            missing = pd.Series(False, index=df.index)
+        if col.required:
+            reject(missing, f"{col.label} is required")
+        if col.type == "number":
+            numbers = pd.to_numeric(df[col.name], errors="coerce")
+            reject(~missing & numbers.isna(), f"{col.label} must be a number")
+            reject(numbers < col.min_value, f"{col.label} must be at least {col.min_value:g}")
+            df[col.name] = numbers
+        elif col.type in ("select", "radio"):
+            reject(~missing & ~df[col.name].astype(str).str.strip().isin([str(option) for option in col.options]), f"{col.label} must be one of the listed options")
+        elif col.type == "multiselect":
+            chosen = df[col.name].where(~missing, "").astype(str).str.split(MULTISELECT_SEPARATOR)
+            chosen = chosen.map(lambda values: [value.strip() for value in values if value.strip()])
+            reject(chosen.map(lambda values: any(value not in col.options for value in values)), f"{col.label} must only list the given options")
+            df[col.name] = chosen.where(~missing, None)
+
+    unit_columns = [col for col in columns if col.has_unit_options and col.name in df.columns]
+    for col in unit_columns:
+        unit_key = f"{col.name}_unit"
+        if unit_key in df.columns:
+            unit_values = df[unit_key].where(~blank[unit_key], col.default_unit).astype(str).str.strip()
+            reject(~unit_values.isin(col.unit_options), f"Unit of {col.label} must be one of {', '.join(col.unit_options)}")
+            df[unit_key] = unit_values.where(unit_values.isin(col.unit_options), col.default_unit)
+    try:
+        df, _ = units.normalize_units(df, unit_columns)
+    except units.UnitError as e:
+        return df.iloc[0:0], errors + [str(e)]
+
+    return df[~bad].drop(columns=[f"{col.name}_unit" for col in unit_columns if f"{col.name}_unit" in df.columns]), errors
+
+
+def to_records(df, base):
+    """Merge each validated row over the base record (submitter details, status and defaults)."""
+    values = df.astype(object).where(df.notna(), None)
+    records = []
+    for row in values.to_dict("records"):
+        record = dict(base)
+        record.update({name: value for name, value in row.items() if value is not None})
+        if isinstance(record.get("data_year"), float):
+            record["data_year"] = int(record["data_year"])
+        records.append(record)
+    return records
+
+
+def render_bulk_upload(supabase, schema, validation_table, base, key):
+    """Offer the subcategory's templates for download and insert an uploaded, filled template.
+
+    base is the record every uploaded row starts from, as built for a form submission."""
+    st.caption("Download the template, add one row per facility or record, then upload the filled file.")
+    col1, col2 = st.columns(2)
+    file_stem = schema.name.split(" ")[0]
+    with col1:
+        st.download_button("Download XLSX template", _template_bytes("xlsx", schema.path, schema.mtime, schema), file_name=f"{file_stem}_template.xlsx",
+                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key=f"{key}_xlsx")
+    with col2:
+        st.download_button("Download CSV template", _template_bytes("csv", schema.path, schema.mtime, schema), file_name=f"{file_stem}_template.csv",
+                           mime="text/csv", key=f"{key}_csv")
+
+    uploaded = st.file_uploader("Filled template", type=["xlsx", "csv"], key=f"{key}_file")
+    if uploaded is None:
+        return
+    try:
+        df = read_upload(uploaded)
+    except Exception as e:
+        st.error(f"Could not read {uploaded.name}: {e}")
+        logger.error(f"Could not read upload {uploaded.name} for {schema.name}: {e}")
+        return
+
+    valid, errors = validate_upload(schema, df)
+    for error in errors:
+        st.warning(error)
+    st.write(f"{len(valid)} of {len(df)} rows are ready to submit.")
+    if valid.empty:
+        return
+    st.dataframe(valid.head(20), use_container_width=True)
+
+    if st.button(f"Submit {len(valid)} rows", key=f"{key}_submit"):
+        records = to_records(valid, base)
+        try:
+            inserted = insert_batched(supabase, validation_table, records)
+        except BatchInsertError as e:
+            st.error(f"Error inserting data into {validation_table}: {e}")
+            logger.error(f"Error inserting {len(records)} uploaded rows into {validation_table}: {e}")
+            return
+        invalidate_tables(validation_table)
+        logger.info(f"Inserted {len(inserted)} uploaded rows into {validation_table} for {schema.name}")
+        st.success(f"Submitted {len(inserted)} rows from {uploaded.name} for review.")
@@ -0,0 +1,268 @@
+import os
+import threading
+import logging
+from collections import OrderedDict
+import pandas as pd
+import altair as alt
+import streamlit as st
+import timing
+
+logger = logging.getLogger(__name__)
+
+# Most rows of data embedded in any one chart spec; charts are fed per-year or
+# per-category aggregates, so this is only reached by an unusually long history
+CHART_MAX_ROWS = int(os.environ.get("CHART_MAX_ROWS", "500"))
+
+# Chart objects built so far, keyed by (category, chart title, fingerprint of the plotted data)
+CHART_CACHE_SIZE = 256
+_chart_cache = OrderedDict()
+_chart_lock = threading.Lock()
+
+# One spec per subcategory dashboard:
+# - Required: columns without which the dashboard is not drawn
+# - KPIs: a metric per column over the selected years, aggregated with sum or mean
+#   and shown with Format after multiplying by Scale
+# - Charts: per-year series drawn two to a row. Series are table columns, Derived
+#   columns (the per-year sum of other columns) or extra columns handed to
+#   render_dashboard(), such as emissions from ippu_emissions
+IPPU_DASHBOARDS = {
+    "2A3 - Glass Production": {
+        "Required": ["mass_glass_produced_tonnes", "recycled_glass_fraction", "co2_capture_volume_tonnes", "virgin_material_mass_tonnes"],
+        "Emissions": {"estimated_emissions": "CO2"},
+        "KPIs": [
+            {"Label": "Total Glass Produced", "Column": "mass_glass_produced_tonnes", "Aggregation": "sum", "Format": "{:.2f} tonnes"},
+            {"Label": "Recycled Glass Fraction", "Column": "recycled_glass_fraction", "Aggregation": "mean", "Format": "{:.2f}%", "Scale": 100},
+            {"Label": "CO₂ Captured", "Column": "co2_capture_volume_tonnes", "Aggregation": "sum", "Format": "{:.2f} tonnes"},
+            {"Label": "Virgin Material Mass", "Column": "virgin_material_mass_tonnes", "Aggregation": "sum", "Format": "{:.2f} tonnes"}
+        ],
+        "Charts": [
+            {"Title": "Production vs CO₂ Captured", "Series": ["mass_glass_produced_tonnes", "co2_capture_volume_tonnes"], "YTitle": "Tonnes", "Colors": ["#6a0dad", "#800080"]},
+            {"Title": "Recycled Glass Fraction Over Time", "Series": ["recycled_glass_fraction"], "Aggregation": "mean", "YTitle": "Fraction"},
+            {"Title": "Virgin vs Carbonates Mass", "Series": ["virgin_material_mass_tonnes", "carbonates_consumed_mass_tonnes"], "Mark": "bar", "YTitle": "Tonnes", "Colors": ["#1f77b4", "#ff7f0e"]},
+            {"Title": "Estimated Emissions Over Time", "Series": ["estimated_emissions"], "YTitle": "tCO₂", "Colors": ["#d62728"]},
+            {"Title": "Estimated Emissions vs CO₂ Captured", "Series": ["estimated_emissions", "co2_capture_volume_tonnes"], "YTitle": "Tonnes", "Colors": ["#d62728", "#800080"]}
+        ]
+    },
+    "2D - Non-Energy Products from Fuels and Solvent Use": {
+        "Required": ["total_mass_motor_oils_tonnes", "total_mass_industrial_oils_tonnes", "total_mass_greases_tonnes", "mass_paraffin_wax_tonnes"],
+        "KPIs": [
+            {"Label": "Motor Oils", "Column": "total_mass_motor_oils_tonnes", "Aggregation": "sum", "Format": "{:.2f} tonnes"},
+            {"Label": "Industrial Oils", "Column": "total_mass_industrial_oils_tonnes", "Aggregation": "sum", "Format": "{:.2f} tonnes"},
+            {"Label": "Greases", "Column": "total_mass_greases_tonnes", "Aggregation": "sum", "Format": "{:.2f} tonnes"},
+            {"Label": "Paraffin Wax", "Column": "mass_paraffin_wax_tonnes", "Aggregation": "sum", "Format": "{:.2f} tonnes"}
+        ],
+        "Charts": [
+            {"Title": "Motor, Industrial, and Grease Mass Over Time", "Series": ["total_mass_motor_oils_tonnes", "total_mass_industrial_oils_tonnes", "total_mass_greases_tonnes"], "YTitle": "Tonnes", "Colors": ["#1f77b4", "#ff7f0e", "#2ca02c"]},
+            {"Title": "Paraffin Wax Supply Trend", "Series": ["mass_paraffin_wax_tonnes"], "YTitle": "Tonnes"}
+        ]
+    },
+    "2F – Product Uses as Substitutes for Ozone-Depleting Substances": {
+        "Required": ["mass_hfcs_supplied_tonnes", "mass_gas_fire_protection_tonnes", "mass_hfcs_aerosols_tonnes", "mass_solvents_hfcs_pfcs_tonnes"],
+        "Derived": {"total_ods_mass": ["mass_hfcs_supplied_tonnes", "mass_gas_fire_protection_tonnes", "mass_hfcs_aerosols_tonnes", "mass_solvents_hfcs_pfcs_tonnes"]},
+        "KPIs": [
+            {"Label": "HFCs Supplied", "Column": "mass_hfcs_supplied_tonnes", "Aggregation": "sum", "Format": "{:.2f} tonnes"},
+            {"Label": "Fire Protection", "Column": "mass_gas_fire_protection_tonnes", "Aggregation": "sum", "Format": "{:.2f} tonnes"},
+            {"Label": "HFCs Aerosols", "Column": "mass_hfcs_aerosols_tonnes", "Aggregation": "sum", "Format": "{:.2f} tonnes"},
+            {"Label": "Solvents HFCs/PFCs", "Column": "mass_solvents_hfcs_pfcs_tonnes", "Aggregation": "sum", "Format": "{:.2f} tonnes"}
+        ],
+        "Charts": [
+            {"Title": "HFCs by Use Category", "Series": ["mass_hfcs_supplied_tonnes", "mass_gas_fire_protection_tonnes", "mass_hfcs_aerosols_tonnes", "mass_solvents_hfcs_pfcs_tonnes"], "YTitle": "Tonnes", "Colors": ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728"]},
+            {"Title": "Total ODS Substitute Mass", "Series": ["total_ods_mass"], "YTitle": "Tonnes"}
+        ]
+    },
+    "2G1 – Electrical Equipment": {
+        "Required": ["fluorinated_gases_manufacturing_kg", "fluorinated_gases_installation_kg", "fluorinated_gases_nameplate_capacity_kg"],
+        "KPIs": [
+            {"Label": "Manufacturing", "Column": "fluorinated_gases_manufacturing_kg", "Aggregation": "sum", "Format": "{:.2f} kg"},
+            {"Label": "Installation", "Column": "fluorinated_gases_installation_kg", "Aggregation": "sum", "Format": "{:.2f} kg"},
+            {"Label": "Nameplate Capacity", "Column": "fluorinated_gases_nameplate_capacity_kg", "Aggregation": "sum", "Format": "{:.2f} kg"}
+        ],
+        "Charts": [
+            {"Title": "Manufacturing vs Installation vs Nameplate Capacity", "Series": ["fluorinated_gases_manufacturing_kg", "fluorinated_gases_installation_kg", "fluorinated_gases_nameplate_capacity_kg"], "YTitle": "kg", "Colors": ["#1f77b4", "#ff7f0e", "#2ca02c"]}
+        ]
+    },
+    "2G2 – SF₆ and PFCs from Other Product Uses": {
+        "Required": ["sf6_pfc_sales_other_uses", "awacs_aircraft_count", "research_particle_accelerators_count", "industrial_particle_accelerators_high_voltage_count", "industrial_particle_accelerators_low_voltage_count", "medical_radiotherapy_units_count", "soundproof_windows_sales_volume"],
+        "KPIs": [
+            {"Label": "SF6/PFC Sales", "Column": "sf6_pfc_sales_other_uses", "Aggregation": "sum", "Format": "{:.2f} tonnes"},
+            {"Label": "AWACS Aircraft", "Column": "awacs_aircraft_count", "Aggregation": "sum", "Format": "{:.0f} units"},
+            {"Label": "Research Accelerators", "Column": "research_particle_accelerators_count", "Aggregation": "sum", "Format": "{:.0f} units"},
+            {"Label": "Soundproof Windows", "Column": "soundproof_windows_sales_volume", "Aggregation": "sum", "Format": "{:.2f} volume"}
+        ],
+        "Charts": [
+            {"Title": "SF6/PFC Sales Over Time", "Series": ["sf6_pfc_sales_other_uses"], "YTitle": "Tonnes"},
+            {"Title": "Equipment Counts Over Time", "Series": ["awacs_aircraft_count", "research_particle_accelerators_count", "industrial_particle_accelerators_high_voltage_count"], "YTitle": "Count", "Colors": ["#1f77b4", "#ff7f0e", "#2ca02c"]}
+        ]
+    },
+    "2G3 – N₂O from Product Uses": {
+        "Required": ["mass_n2o_supplied_kg"],
+        "KPIs": [
+            {"Label": "N₂O Supplied", "Column": "mass_n2o_supplied_kg", "Aggregation": "sum", "Format": "{:.2f} kg"}
+        ],
+        "Charts": [
+            {"Title": "N₂O Supplied Over Time", "Series": ["mass_n2o_supplied_kg"], "YTitle": "kg"}
+        ]
+    },
+    "2H1 - Pulp and Paper Industry": {
+        "Required": ["dry_pulp_produced_tonnes"],
+        "KPIs": [
+            {"Label": "Dry Pulp Produced", "Column": "dry_pulp_produced_tonnes", "Aggregation": "sum", "Format": "{:.2f} tonnes"}
+        ],
+        "Charts": [
+            {"Title": "Dry Pulp Production Over Time", "Series": ["dry_pulp_produced_tonnes"], "YTitle": "Tonnes"}
+        ]
+    },
+    "2H2 - Food and Beverages Industry": {
+        "Required": ["food_beverage_produced_tonnes"],
+        "KPIs": [
+            {"Label": "Food/Beverage Produced", "Column": "food_beverage_produced_tonnes", "Aggregation": "sum", "Format": "{:.2f} tonnes"}
+        ],
+        "Charts": [
+            {"Title": "Food/Beverage Production Over Time", "Series": ["food_beverage_produced_tonnes"], "YTitle": "Tonnes"}
+        ]
+    }
+}
+
+
+def _table_columns(spec):
+    """Return every table column a spec reads, in first-use order."""
+    columns = list(spec.get("Required", []))
+    columns += [kpi["Column"] for kpi in spec.get("KPIs", [])]
+    for chart in spec.get("Charts", []):
+        columns += [series for series in chart["Series"] if series not in spec.get("Derived", {}) and series not in spec.get("Emissions", {})]
+    for sources in spec.get("Derived", {}).values():
+        columns += sources
+    return list(dict.fromkeys(columns))
+
+
+@timing.traced("aggregate dashboard")
+def aggregate(spec, df, extra=None):
+    """Aggregate everything a dashboard shows in one grouped pass over its rows.
+
+    Returns (per-year sums, per-year counts, range-wide sums, range-wide counts).
+    Means are sums divided by counts, so the same pass serves both."""
+    columns = [column for column in _table_columns(spec) if column in df.columns]
+    grouped = df.groupby("data_year")[columns].agg(["sum", "count"])
+    sums, counts = grouped.xs("sum", axis=1, level=1).copy(), grouped.xs("count", axis=1, level=1).copy()
+    for name, sources in spec.get("Derived", {}).items():
+        sums[name] = sums[[source for source in sources if source in sums.columns]].sum(axis=1)
+        counts[name] = counts[[source for source in sources if source in counts.columns]].max(axis=1)
+    if extra is not None:
+        sums = sums.join(extra, how="outer").fillna(0)
+        counts = counts.join(extra.notna().astype(int), how="outer").fillna(0)
+    return sums, counts, sums.sum(), counts.sum()
+
+
+def within_budget(data, title, keep="last", by=None, max_rows=None):
+    """Cap the rows a chart embeds at max_rows (CHART_MAX_ROWS by default).
+
+    keep="last" keeps the final rows, e.g. the latest years; keep="largest"
+    keeps the rows with the largest values in column `by`."""
+    max_rows = max_rows or CHART_MAX_ROWS
+    if len(data) <= max_rows:
+        return data
+    logger.warning(f"Chart '{title}' has {len(data)} rows, keeping {max_rows}")
+    if keep == "largest":
+        return data.nlargest(max_rows, by).reset_index(drop=True)
+    return data.tail(max_rows).reset_index(drop=True)
+
+
+def _series_frame(chart, sums, counts):
+    """Return the per-year values a chart plots: sums, or means when the chart aggregates with mean."""
+    series = [column for column in chart["Series"] if column in sums.columns]
+    values = sums[series]
+    if chart.get("Aggregation") == "mean":
+        values = values / counts[series].where(counts[series] > 0)
+    return within_budget(values.rename_axis("data_year").reset_index(), chart["Title"])
+
+
+def _fingerprint(df):
+    return int(pd.util.hash_pandas_object(df, index=False).sum()), tuple(df.columns)
+
+
+def _build_chart(chart, data):
+    with timing.span("chart", title=chart["Title"]):
+        return _chart(chart, data)
+
+
+def _chart(chart, data):
+    series = [column for column in chart["Series"] if column in data.columns]
+    colors = chart.get("Colors")
+    base = alt.Chart(data)
+    if len(series) == 1:
+        column = series[0]
+        return (
+            base.mark_line(color=(colors or ["#2c3e50"])[0])
+            .encode(
+                x=alt.X("data_year:O", title="Year"),
+                y=alt.Y(f"{column}:Q", title=chart["YTitle"]),
+                tooltip=["data_year:O", f"{column}:Q"]
+            )
+            .properties(title=chart["Title"], height=350, width=400)
+        )
+    folded = base.transform_fold(series, as_=["key", "value"])
+    encoding = {
+        "x": alt.X("data_year:O", title="Year"),
+        "y": alt.Y("value:Q", title=chart["YTitle"]),
+        "color": alt.Color("key:N", scale=alt.Scale(range=colors) if colors else alt.Undefined, legend=alt.Legend(title="Metric")),
+        "tooltip": ["data_year:O", "key:N", "value:Q"]
+    }
+    if chart.get("Mark") == "bar":
+        return folded.mark_bar().encode(xOffset="key:N", **encoding).properties(title=chart["Title"], height=350, width=400)
+    return folded.mark_line().encode(**encoding).properties(title=chart["Title"], height=350, width=400)
+
+
+def chart_for(name, chart, data):
+    """Return the Altair chart for data, reusing the one built for identical data."""
+    key = (name, chart["Title"], _fingerprint(data))
+    with _chart_lock:
+        cached = _chart_cache.get(key)
+        if cached is not None:
+            _chart_cache.move_to_end(key)
+            return cached
+    built = _build_chart(chart, data)
+    with _chart_lock:
+        _chart_cache[key] = built
+        while len(_chart_cache) > CHART_CACHE_SIZE:
+            _chart_cache.popitem(last=False)
+    return built
+
+
+def render_dashboard(name, spec, df, extra=None):
+    """Draw a dashboard spec's KPIs and charts from a category's rows.
+
+    `extra` is a frame indexed by data_year with further series, such as
+    emissions, that the rows themselves do not hold."""
+    missing = [column for column in spec.get("Required", []) if column not in df.columns]
+    if missing:
+        st.warning(f"Required columns for {name.split(' ')[0]} dashboard are missing. Please check the database.")
+        logger.warning(f"Columns {missing} missing for {name} dashboard")
+        return
+    sums, counts, total_sums, total_counts = aggregate(spec, df, extra)
+
+    kpis = spec.get("KPIs", [])
+    st.markdown('<div class="kpi-row">', unsafe_allow_html=True)
+    for column, kpi in zip(st.columns(max(len(kpis), 4)), kpis):
+        value = total_sums.get(kpi["Column"], 0)
+        if kpi["Aggregation"] == "mean":
+            count = total_counts.get(kpi["Column"], 0)
+            value = value / count if count else float("nan")
+        with column:
+            st.markdown('<div class="kpi-card">', unsafe_allow_html=True)
+            st.metric(kpi["Label"], kpi["Format"].format(value * kpi.get("Scale", 1)))
+            st.markdown('</div>', unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    charts = spec.get("Charts", [])
+    for start in range(0, len(charts), 2):
+        st.markdown('<div class="chart-layout">', unsafe_allow_html=True)
+        for column, chart in zip(st.columns(2), charts[start:start + 2]):
+            data = _series_frame(chart, sums, counts)
+            if len(data.columns) < 2:
+                logger.warning(f"No series available for chart '{chart['Title']}' in {name} dashboard")
+                continue
+            with column:
+                st.markdown('<div class="chart-card">', unsafe_allow_html=True)
+                st.altair_chart(chart_for(name, chart, data), use_container_width=True)
+                st.markdown('</div>', unsafe_allow_html=True)
+        st.markdown('</div>', unsafe_allow_html=True)
@@ -1,109 +1,192 @@
+import time
+import threading
+import numpy as np
 import pandas as pd
 import streamlit as st
-from postgrest.exceptions import APIError
 import logging
+from data_fetch import aggregate_tables
+from query_cache import query_cache, table_ttl
+import ippu_catalog
+import units
+import timing
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def data_collation_view(supabase, year_range):
-    activity_mappings = {
-        "2A3 - Glass Production": [
-            {"Activity": "Glass Production", "Column": "mass_glass_produced_tonnes", "Units": "tonnes", "Notes": "Total mass of glass produced (IPCC 2006, Tier 1, Volume 3, Chapter 2.3)", "Aggregation": "sum"},
-            {"Activity": "Recycled Glass Fraction", "Column": "recycled_glass_fraction", "Units": "fraction", "Notes": "Fraction of recycled glass used in production", "Aggregation": "mean"},
-            {"Activity": "CO₂ Capture Volume", "Column": "co2_capture_volume_tonnes", "Units": "tonnes", "Notes": "CO₂ captured from glass production processes", "Aggregation": "sum"},
-            {"Activity": "Virgin Material Mass", "Column": "virgin_material_mass_tonnes", "Units": "tonnes", "Notes": "Mass of virgin material used in glass production", "Aggregation": "sum"},
-            {"Activity": "Carbonates Consumed", "Column": "carbonates_consumed_mass_tonnes", "Units": "tonnes", "Notes": "Mass of carbonates consumed, key for CO₂ emissions (IPCC 2006)", "Aggregation": "sum"},
-            {"Activity": "Emissions Factor", "Column": "emissions_factor_tco2", "Units": "tCO₂/tonne", "Notes": "Emissions factor for glass production", "Aggregation": "mean"}
-        ],
-        "2D - Non-Energy Products from Fuels and Solvent Use": [
-            {"Activity": "Motor Oils", "Column": "total_mass_motor_oils_tonnes", "Units": "tonnes", "Notes": "Mass of motor oils used (IPCC 2006, Tier 1, Volume 3, Chapter 5.4)", "Aggregation": "sum"},
-            {"Activity": "Industrial Oils", "Column": "total_mass_industrial_oils_tonnes", "Units": "tonnes", "Notes": "Mass of industrial oils used", "Aggregation": "sum"},
-            {"Activity": "Greases", "Column": "total_mass_greases_tonnes", "Units": "tonnes", "Notes": "Mass of greases used", "Aggregation": "sum"},
-            {"Activity": "Paraffin Wax", "Column": "mass_paraffin_wax_tonnes", "Units": "tonnes", "Notes": "Mass of paraffin wax used (IPCC 2006, Tier 1)", "Aggregation": "sum"}
-        ],
-        "2F – Product Uses as Substitutes for Ozone-Depleting Substances": [
-            {"Activity": "HFCs Supplied (Foam Blowing)", "Column": "mass_hfcs_supplied_tonnes", "Units": "tonnes", "Notes": "HFCs supplied for foam blowing agents (IPCC 2006, Tier 1, Volume 3, Chapter 7.2)", "Aggregation": "sum"},
-            {"Activity": "Gas Fire Protection", "Column": "mass_gas_fire_protection_tonnes", "Units": "tonnes", "Notes": "HFCs/PFCs used in fire protection equipment", "Aggregation": "sum"},
-            {"Activity": "HFCs Aerosols", "Column": "mass_hfcs_aerosols_tonnes", "Units": "tonnes", "Notes": "HFCs used in aerosols", "Aggregation": "sum"},
-            {"Activity": "Solvents HFCs/PFCs", "Column": "mass_solvents_hfcs_pfcs_tonnes", "Units": "tonnes", "Notes": "HFCs/PFCs used in solvents (IPCC 2006, Tier 1)", "Aggregation": "sum"}
-        ],
-        "2G1 – Electrical Equipment": [
-            {"Activity": "Fluorinated Gases Manufacturing", "Column": "fluorinated_gases_manufacturing_kg", "Units": "kg", "Notes": "SF6/PFC used in manufacturing electrical equipment (IPCC 2006, Tier 1, Volume 3, Chapter 7.3)", "Aggregation": "sum"},
-            {"Activity": "Fluorinated Gases Installation", "Column": "fluorinated_gases_installation_kg", "Units": "kg", "Notes": "SF6/PFC used during equipment installation", "Aggregation": "sum"},
-            {"Activity": "Fluorinated Gases Nameplate Capacity", "Column": "fluorinated_gases_nameplate_capacity_kg", "Units": "kg", "Notes": "Nameplate capacity of SF6/PFC in equipment", "Aggregation": "sum"}
-        ],
-        "2G2 – SF₆ and PFCs from Other Product Uses": [
-            {"Activity": "SF6/PFC Sales Other Uses", "Column": "sf6_pfc_sales_other_uses", "Units": "kg", "Notes": "SF6/PFC sales for non-electrical uses (IPCC 2006, Tier 1, Volume 3, Chapter 7.3)", "Aggregation": "sum"},
-            {"Activity": "AWACS Aircraft Count", "Column": "awacs_aircraft_count", "Units": "count", "Notes": "Number of AWACS aircraft using SF6/PFC", "Aggregation": "sum"},
-            {"Activity": "Research Particle Accelerators", "Column": "research_particle_accelerators_count", "Units": "count", "Notes": "Number of research particle accelerators using SF6/PFC", "Aggregation": "sum"},
-            {"Activity": "Industrial Particle Accelerators (High Voltage)", "Column": "industrial_particle_accelerators_high_voltage_count", "Units": "count", "Notes": "Number of high-voltage industrial accelerators", "Aggregation": "sum"},
-            {"Activity": "Industrial Particle Accelerators (Low Voltage)", "Column": "industrial_particle_accelerators_low_voltage_count", "Units": "count", "Notes": "Number of low-voltage industrial accelerators", "Aggregation": "sum"},
-            {"Activity": "Medical Radiotherapy Units", "Column": "medical_radiotherapy_units_count", "Units": "count", "Notes": "Number of radiotherapy units using SF6/PFC", "Aggregation": "sum"},
-            {"Activity": "Soundproof Windows Sales", "Column": "soundproof_windows_sales_volume", "Units": "volume", "Notes": "Sales volume of soundproof windows using SF6", "Aggregation": "sum"}
-        ],
-        "2G3 – N₂O from Product Uses": [
-            {"Activity": "N₂O Supplied", "Column": "mass_n2o_supplied_kg", "Units": "kg", "Notes": "N₂O supplied for product uses (IPCC 2006, Tier 1, Volume 3, Chapter 7.4)", "Aggregation": "sum"}
-        ],
-        "2H1 - Pulp and Paper Industry": [
-            {"Activity": "Dry Pulp Produced", "Column": "dry_pulp_produced_tonnes", "Units": "tonnes", "Notes": "Dry pulp produced in pulp and paper industry (IPCC 2006, Tier 1, Volume 3, Chapter 7.5)", "Aggregation": "sum"}
-        ],
-        "2H2 - Food and Beverages Industry": [
-            {"Activity": "Food/Beverage Produced", "Column": "food_beverage_produced_tonnes", "Units": "tonnes", "Notes": "Food and beverage production (IPCC 2006, Tier 1, Volume 3, Chapter 7.5)", "Aggregation": "sum"}
-        ]
-    }
+ROW_COLUMNS = ["Activity", "Category", "Units", "Notes"]
+YEAR_FORMAT = "%.2f"
+
+# Unit each dimension is reported in; activities stored in another unit of that
+# dimension (the kg columns of 2G1 and 2G3) are converted so a category's rows add up.
+# Catalog units must name the unit a column is stored in, i.e. its form's required_unit
+REPORT_UNITS = {"mass": "tonnes", "volume": "m³"}
+
+# Full-range matrices keyed by the queries they were built from and the table versions at the time
+_pivot_cache = {}
+_pivot_lock = threading.Lock()
+
+
+def _activity_frame():
+    """One row per catalog activity, in catalog order, with its display and aggregation metadata."""
+    rows = []
+    for subcategory in ippu_catalog.CATEGORIES:
+        for activity in ippu_catalog.activities(subcategory):
+            rows.append({
+                "Subcategory": subcategory,
+                "Column": activity["Column"],
+                "Activity": activity["Activity"],
+                "Category": subcategory.split(" - ")[0],
+                "Units": activity["Units"],
+                "Notes": activity["Notes"],
+                "Aggregation": activity["Aggregation"]
+            })
+    return pd.DataFrame(rows)
+
+
+def _report_units(stored_units):
+    """Return (factor to apply, unit reported) for each catalog unit; unregistered units are kept as they are."""
+    distinct = {unit: REPORT_UNITS.get(units.dimension(unit), unit) for unit in set(stored_units)}
+    reported = [distinct[unit] for unit in stored_units]
+    return np.array([units.factor(stored, unit) for stored, unit in zip(stored_units, reported)]), reported
+
+
+def _column_warnings(subcategory, columns):
+    """Return (whether rows with these columns can be collated, warnings about missing columns)."""
+    if "data_year" not in columns:
+        return False, [f"No 'data_year' column found in table: {subcategory}"]
+    return True, [
+        f"Column {column} not found in table: {subcategory}"
+        for column in ippu_catalog.activity_columns(subcategory) if column not in columns
+    ]
+
+
+def partial_aggregate(subcategory, df):
+    """Sum and count every activity of one category per year.
+
+    Partials of different chunks combine by adding them (combine_partials), so
+    a table can be collated one chunk at a time."""
+    columns = [column for column in ippu_catalog.activity_columns(subcategory) if column in df.columns]
+    if not columns:
+        return None
+    long_df = df[["data_year"] + columns].melt(id_vars="data_year", var_name="Column", value_name="value")
+    long_df["data_year"] = pd.to_numeric(long_df["data_year"], errors="coerce")
+    long_df["value"] = pd.to_numeric(long_df["value"], errors="coerce")
+    long_df = long_df.dropna(subset=["data_year"]).astype({"data_year": int}).assign(Subcategory=subcategory)
+    return long_df.groupby(["Subcategory", "Column", "data_year"])["value"].agg(["sum", "count"])
+
+
+def combine_partials(partials):
+    partials = [partial for partial in partials if partial is not None]
+    if not partials:
+        return None
+    if len(partials) == 1:
+        return partials[0]
+    return pd.concat(partials).groupby(level=[0, 1, 2]).sum()
+
+
+@timing.traced("aggregate collation")
+def collate_partials(grouped):
+    """Build the activity matrix from combined partials.
 
-    collated_data = []
-    for subcategory, activities in activity_mappings.items():
-        try:
-            response = supabase.table(subcategory).select("*").execute()
-            if not response.data:
-                st.warning(f"No data found in table: {subcategory}")
-                continue
-            df = pd.DataFrame(response.data)
-
-            if "data_year" in df.columns:
-                df["data_year"] = pd.to_numeric(df["data_year"], errors="coerce")
-                df = df[(df["data_year"] >= year_range[0]) & (df["data_year"] <= year_range[1])]
-            else:
-                st.warning(f"No 'data_year' column found in table: {subcategory}")
-                continue
-
-            for activity in activities:
-                column = activity["Column"]
-                if column not in df.columns:
-                    st.warning(f"Column {column} not found in table: {subcategory}")
-                    continue
-
-                df[column] = pd.to_numeric(df[column], errors="coerce")
-
-                if activity["Aggregation"] == "sum":
-                    agg_df = df.groupby("data_year")[column].sum().reset_index()
-                else:
-                    agg_df = df.groupby("data_year")[column].mean().reset_index()
-
-                row = {
-                    "Activity": activity["Activity"],
-                    "Category": subcategory.split(" - ")[0],
-                    "Units": activity["Units"],
-                    "Notes": activity["Notes"]
-                }
-                for year in range(year_range[0], year_range[1] + 1):
-                    year_data = agg_df[agg_df["data_year"] == year][column]
-                    row[str(year)] = year_data.iloc[0] if not year_data.empty else (0 if activity["Aggregation"] == "sum" else None)
-                collated_data.append(row)
-
-        except APIError as e:
-            st.error(f"Error fetching table {subcategory}: {e.message}")
+    Returns a numeric matrix indexed by (Activity, Category, Units, Notes) with
+    one column per year present in the data, plus a boolean Series marking the
+    rows aggregated with sum."""
+    if grouped is None or grouped.empty:
+        return pd.DataFrame(), pd.Series(dtype=bool)
+    sums = grouped["sum"].unstack("data_year").sort_index(axis=1)
+    # Years where every value is missing have a count of 0 and so no mean
+    means = (grouped["sum"] / grouped["count"].where(grouped["count"] > 0)).unstack("data_year").reindex(columns=sums.columns)
+
+    # Keep catalog order and only the activities whose column was fetched
+    activities = _activity_frame()
+    keys = pd.MultiIndex.from_frame(activities[["Subcategory", "Column"]])
+    present = keys.isin(sums.index)
+    activities, keys = activities[present], keys[present]
+    is_sum = (activities["Aggregation"] == "sum").to_numpy()
+    matrix = sums.reindex(keys)
+    matrix[~is_sum] = means.reindex(keys)[~is_sum]
+    # Sums and means both scale linearly, so every row is normalized in one multiplication
+    scale, reported = _report_units(activities["Units"].tolist())
+    matrix = matrix.mul(scale, axis=0)
+    matrix.index = pd.MultiIndex.from_frame(activities[ROW_COLUMNS].assign(Units=reported))
+    matrix.columns.name = None
+    return matrix, pd.Series(is_sum, index=matrix.index)
+
+
+def collate(frames):
+    """Aggregate every activity per year in one grouped pass over in-memory frames."""
+    return collate_partials(combine_partials(partial_aggregate(subcategory, df) for subcategory, df in frames.items()))
+
+
+def _collation_step(subcategory, state, chunk):
+    """Fold one chunk of a validated table into (columns seen, combined partial)."""
+    if state is None:
+        state = (set(chunk.columns), None)
+    columns, grouped = state
+    if "data_year" not in chunk.columns:
+        return state
+    return columns, combine_partials([grouped, partial_aggregate(subcategory, chunk)])
+
+
+def slice_years(matrix, is_sum, year_range):
+    """Select a year range from a collated matrix; years without data are 0 for sums and empty for means."""
+    years = list(range(year_range[0], year_range[1] + 1))
+    sliced = matrix.reindex(columns=years)
+    sliced[is_sum.to_numpy()] = sliced[is_sum.to_numpy()].fillna(0)
+    sliced.columns = [str(year) for year in years]
+    return sliced.reset_index()
+
+
+def full_range_matrix(supabase):
+    """Return the full-range matrix of the validated tables, rebuilt after invalidation or expiry."""
+    queries = {subcategory: ippu_catalog.validated_query(subcategory) for subcategory in ippu_catalog.CATEGORIES}
+    key = tuple((query, query_cache.version(query.table)) for query in queries.values())
+    ttl = min(table_ttl(query.table) for query in queries.values())
+    with _pivot_lock:
+        cached = _pivot_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] <= ttl:
+        return cached[1], cached[2], cached[3], {}
+
+    # Each table is read and folded a page at a time, so memory does not grow with its history
+    states, fetch_errors = aggregate_tables(supabase, queries, _collation_step)
+    partials, warnings = [], []
+    for subcategory, state in states.items():
+        if state is None:
+            warnings.append(f"No data found in table: {subcategory}")
             continue
+        ok, column_warnings = _column_warnings(subcategory, state[0])
+        warnings.extend(column_warnings)
+        if ok:
+            partials.append(state[1])
+    matrix, is_sum = collate_partials(combine_partials(partials))
+    if not fetch_errors:
+        with _pivot_lock:
+            _pivot_cache.clear()
+            _pivot_cache[key] = (time.monotonic(), matrix, is_sum, warnings)
+    return matrix, is_sum, warnings, fetch_errors
+
+
+def year_column_config(collated_df):
+    """Column config that formats the numeric year columns for display."""
+    return {
+        column: st.column_config.NumberColumn(column, format=YEAR_FORMAT)
+        for column in collated_df.columns if column not in ROW_COLUMNS
+    }
+
+
+def data_collation_view(supabase, year_range):
+    """Collate activity data per year as a numeric Activity x year frame.
+
+    The full-range matrix of the validated tables is built once, cached, and
+    sliced to year_range."""
+    matrix, is_sum, warnings, fetch_errors = full_range_matrix(supabase)
+    for table, message in fetch_errors.items():
+        st.error(f"Error fetching table {table}: {message}")
+    for warning in warnings:
+        st.warning(warning)
 
-    if not collated_data:
+    if matrix.empty:
         st.error("No data available for collation across any subcategories.")
         return pd.DataFrame()
 
-    collated_df = pd.DataFrame(collated_data)
-    year_columns = [str(year) for year in range(year_range[0], year_range[1] + 1)]
-    collated_df = collated_df[["Activity", "Category", "Units", "Notes"] + year_columns]
-    for col in year_columns:
-        collated_df[col] = collated_df[col].apply(lambda x: f"{x:.2f}" if pd.notnull(x) else x)
-    return collated_df
\ No newline at end of file
+    return slice_years(matrix, is_sum, year_range)
@@ -0,0 +1,219 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, replace
+import pandas as pd
+from query_cache import query_cache
+from table_mirror import mirror
+import timing
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on concurrent table queries across all sessions in this process
+FETCH_MAX_WORKERS = int(os.environ.get("FETCH_MAX_WORKERS", "8"))
+# Rows per page; must not exceed the server's max-rows setting (1000 on Supabase by default)
+FETCH_PAGE_SIZE = int(os.environ.get("FETCH_PAGE_SIZE", "1000"))
+
+_executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix="table-fetch")
+# Page requests run on their own pool so a table read on _executor can prefetch its next page
+_page_executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix="table-page")
+
+
+@dataclass(frozen=True)
+class TableQuery:
+    """A read against one table: projected columns, (method, column, *args) filters,
+    (column, descending) orderings and an optional row limit. With `count` set
+    ("exact", "planned" or "estimated") only the number of matching rows is read."""
+    table: str
+    columns: str = "*"
+    filters: tuple = ()
+    order: tuple = ()
+    limit: int = None
+    count: str = None
+
+    def build(self, supabase):
+        if self.count:
+            query = supabase.table(self.table).select(self.columns, count=self.count, head=True)
+        else:
+            query = supabase.table(self.table).select(self.columns)
+        for method, column, *args in self.filters:
+            query = getattr(query, method)(column, *args)
+        for column, desc in self.order:
+            query = query.order(column, desc=desc)
+        if self.limit is not None:
+            query = query.limit(self.limit)
+        return query
+
+
+@dataclass(frozen=True)
+class AggregateKey:
+    """Query cache key for a reduction of a query's rows, told apart from the rows themselves by name."""
+    query: TableQuery
+    name: str
+
+    @property
+    def table(self):
+        return self.query.table
+
+
+def _page_requests(supabase, query):
+    """Return (request for the next page, columns to drop) for walking query page by page.
+
+    Unordered queries use keyset pagination on id; ordered ones page by offset
+    with id as the tie-breaker."""
+    columns = [column.strip() for column in query.columns.split(",")]
+    extra = []
+    if query.columns.strip() != "*" and "id" not in columns:
+        extra = ["id"]
+    base = replace(query, columns=",".join(columns + extra), limit=None)
+
+    def request(last_id, offset, size):
+        page = base.build(supabase)
+        if query.order:
+            return page.order("id").range(offset, offset + size - 1)
+        if last_id is not None:
+            page = page.gt("id", last_id)
+        return page.order("id").range(0, size - 1)
+
+    return request, extra
+
+
+def iter_table(supabase, query, page_size=None):
+    """Yield the rows of a TableQuery as DataFrame chunks of at most page_size rows.
+
+    Reads past the server's max-rows cap by walking range() pages. The next
+    page is requested before the current one is yielded, so one request is
+    always in flight while the caller processes a chunk."""
+    page_size = page_size or FETCH_PAGE_SIZE
+    if mirror is not None:
+        df = mirror.read(query)
+        if df is not None:
+            for start in range(0, len(df), page_size):
+                yield df.iloc[start:start + page_size].reset_index(drop=True)
+            return
+    request, extra = _page_requests(supabase, query)
+
+    def fetch(last_id, offset):
+        size = page_size if query.limit is None else min(page_size, query.limit - offset)
+        with timing.span("backend.select", table=query.table) as span:
+            rows = request(last_id, offset, size).execute().data or []
+            if span.enabled:
+                span.add(rows=len(rows), bytes=timing.payload_bytes(rows))
+        return size, rows
+
+    offset = 0
+    future = _page_executor.submit(timing.bind(fetch), None, 0)
+    while future is not None:
+        size, rows = future.result()
+        offset += len(rows)
+        future = None
+        if len(rows) == size and (query.limit is None or offset < query.limit):
+            future = _page_executor.submit(timing.bind(fetch), rows[-1].get("id"), offset)
+        if rows:
+            with timing.span("frame.build", table=query.table) as span:
+                chunk = pd.DataFrame(rows).drop(columns=extra, errors="ignore")
+                span.add(rows=len(chunk))
+            yield chunk
+
+
+def count_rows(supabase, query):
+    """Return the number of rows matching a count query without transferring them."""
+    if mirror is not None:
+        df = mirror.read(query)
+        if df is not None:
+            return len(df)
+    with timing.span("backend.count", table=query.table):
+        return query.build(supabase).execute().count or 0
+
+
+def fetch_table(supabase, query):
+    """Run a single TableQuery and return all of its rows as a DataFrame, from the local mirror when it can answer.
+
+    Count queries return a one-row frame with the count in its "count" column."""
+    with timing.span("fetch", table=query.table):
+        if query.count:
+            return pd.DataFrame({"count": [count_rows(supabase, query)]})
+        chunks = list(iter_table(supabase, query))
+        if not chunks:
+            return pd.DataFrame()
+        if len(chunks) == 1:
+            return chunks[0]
+        with timing.span("frame.build", table=query.table):
+            return pd.concat(chunks, ignore_index=True)
+
+
+def aggregate_table(supabase, query, step, key=None):
+    """Fold step(key, result, chunk) over the chunks of a query; result starts as None.
+
+    Only one chunk is held in memory at a time, however many rows the table has."""
+    result = None
+    with timing.span("aggregate", table=query.table):
+        for chunk in iter_table(supabase, query):
+            result = step(key, result, chunk)
+    return result
+
+
+def _error_message(error):
+    return getattr(error, "message", None) or str(error)
+
+
+def fetch_tables(supabase, queries, use_cache=True):
+    """Run several TableQuery objects concurrently on the shared fetch pool.
+
+    `queries` maps a caller-chosen key to a TableQuery. Returns (frames, errors):
+    frames maps each successful key to its DataFrame in the order given, errors
+    maps each failed key to its error message. One failing table does not
+    hold up or cancel the others. Queries answered by the shared query cache
+    are not sent to the server at all."""
+    results, errors = {}, {}
+    pending, versions = {}, {}
+    for key, query in queries.items():
+        cached = query_cache.get(query) if use_cache else None
+        if cached is not None:
+            results[key] = cached
+        else:
+            pending[key] = query
+            # Taken before the read, so rows fetched across an invalidation are not cached as fresh
+            versions[key] = query_cache.version(query.table)
+    futures = {_executor.submit(timing.bind(fetch_table), supabase, query): key for key, query in pending.items()}
+    for future in as_completed(futures):
+        key = futures[future]
+        try:
+            results[key] = future.result()
+            if use_cache:
+                query_cache.put(queries[key], results[key], versions[key])
+        except Exception as e:
+            errors[key] = _error_message(e)
+            logger.error(f"Error fetching table {queries[key].table}: {errors[key]}")
+    frames = {key: results[key] for key in queries if key in results}
+    return frames, errors
+
+
+def aggregate_tables(supabase, queries, step, name=None):
+    """Reduce several TableQuery objects chunk by chunk, concurrently on the shared fetch pool.
+
+    `step(key, result, chunk)` returns the running result for a key, starting
+    from None; it is None for tables without rows. Returns (results, errors)
+    like fetch_tables(). When `name` is given, DataFrame results are cached
+    under it alongside the raw query results."""
+    results, errors = {}, {}
+    pending, versions = {}, {}
+    for key, query in queries.items():
+        cached = query_cache.get(AggregateKey(query, name)) if name else None
+        if cached is not None:
+            results[key] = cached
+        else:
+            pending[key] = query
+            versions[key] = query_cache.version(query.table)
+    futures = {_executor.submit(timing.bind(aggregate_table), supabase, query, step, key): key for key, query in pending.items()}
+    for future in as_completed(futures):
+        key = futures[future]
+        try:
+            results[key] = future.result()
+            if name and isinstance(results[key], pd.DataFrame):
+                query_cache.put(AggregateKey(queries[key], name), results[key], versions[key])
+        except Exception as e:
+            errors[key] = _error_message(e)
+            logger.error(f"Error fetching table {queries[key].table}: {errors[key]}")
+    results = {key: results[key] for key in queries if key in results}
+    return results, errors
@@ -0,0 +1,122 @@
+import ast
+import operator
+from functools import lru_cache
+
+
+class ConditionError(ValueError):
+    """Raised when a form condition uses syntax outside the allowed subset."""
+
+
+def _contains(item, container):
+    if container is None:
+        return False
+    try:
+        return item in container
+    except TypeError:
+        return False
+
+
+def _compare(op, left, right):
+    try:
+        return op(left, right)
+    except TypeError:
+        return False
+
+
+_COMPARE_OPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+
+class Condition:
+    """A field condition compiled to a closure over the names it reads."""
+
+    __slots__ = ("source", "names", "_fn")
+
+    def __init__(self, source, names, fn):
+        self.source = source
+        self.names = names
+        self._fn = fn
+
+    def evaluate(self, form_data, key_prefix=""):
+        """Evaluate against form_data, reading only this condition's own fields."""
+        return bool(self._fn(lambda name: form_data.get(f"{key_prefix}{name}")))
+
+    def __repr__(self):
+        return f"Condition({self.source!r})"
+
+
+def _compile_node(node, names):
+    """Turn an expression node into a closure taking a name lookup function."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (str, int, float, bool, type(None))):
+        value = node.value
+        return lambda lookup: value
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        items = [_compile_node(elt, names) for elt in node.elts]
+        return lambda lookup: [item(lookup) for item in items]
+    if isinstance(node, ast.Name):
+        name = node.id
+        names.add(name)
+        return lambda lookup: lookup(name)
+    if isinstance(node, ast.BoolOp):
+        values = [_compile_node(v, names) for v in node.values]
+        if isinstance(node.op, ast.And):
+            return lambda lookup: all(v(lookup) for v in values)
+        return lambda lookup: any(v(lookup) for v in values)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        operand = _compile_node(node.operand, names)
+        return lambda lookup: not operand(lookup)
+    if isinstance(node, ast.Compare):
+        left = _compile_node(node.left, names)
+        steps = []
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _compile_node(comparator, names)
+            if isinstance(op, ast.In):
+                steps.append((_contains, right))
+            elif isinstance(op, ast.NotIn):
+                steps.append((lambda a, b: not _contains(a, b), right))
+            elif type(op) in _COMPARE_OPS:
+                fn = _COMPARE_OPS[type(op)]
+                steps.append((lambda a, b, fn=fn: _compare(fn, a, b), right))
+            else:
+                raise ConditionError(f"Unsupported comparison: {type(op).__name__}")
+
+        def compare(lookup):
+            current = left(lookup)
+            for fn, right in steps:
+                value = right(lookup)
+                if not fn(current, value):
+                    return False
+                current = value
+            return True
+        return compare
+    raise ConditionError(f"Unsupported expression: {type(node).__name__}")
+
+
+@lru_cache(maxsize=None)
+def compile_condition(source):
+    """Parse a condition string once into a Condition, rejecting anything but
+    names, literals, comparisons, `in`/`not in` and boolean operators."""
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ConditionError(f"Invalid condition {source!r}: {e.msg}") from e
+    names = set()
+    fn = _compile_node(tree.body, names)
+    return Condition(source, frozenset(names), fn)
+
+
+def build_dependency_graph(conditions):
+    """Map each controlling field to the fields whose condition reads it.
+
+    `conditions` is {dependent field name: Condition}."""
+    graph = {}
+    for field_name, condition in conditions.items():
+        for name in condition.names:
+            graph.setdefault(name, []).append(field_name)
+    return {name: tuple(dependents) for name, dependents in graph.items()}
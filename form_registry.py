@@ -0,0 +1,261 @@
+import os
+import glob
+import logging
+import threading
+from dataclasses import dataclass, replace
+from typing import Any, Optional
+import yaml
+from form_conditions import ConditionError, compile_condition, build_dependency_graph
+import timing
+
+logger = logging.getLogger(__name__)
+
+# Use the libyaml-backed loader when PyYAML was built with it
+try:
+    YamlLoader = yaml.CSafeLoader
+except AttributeError:
+    YamlLoader = yaml.SafeLoader
+
+FORMS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "forms")
+
+# Index files and the keys each one uses for its entries
+INDEX_FILES = {
+    "index.yaml": {"list": "subcategories", "file": "file"},
+    "index_w.yaml": {"list": "forms", "file": "path"},
+}
+
+
+def make_key_prefix(form_name):
+    """Return the session key prefix used for a subcategory form's fields and tables."""
+    return f"{form_name.replace(' ', '_').replace('–', '_')}_"
+
+
+@dataclass(frozen=True, slots=True)
+class FieldSpec:
+    name: str
+    label: str
+    type: str = "text"
+    options: tuple = ()
+    default: Any = ""
+    value: Any = ""
+    required: bool = False
+    unit: Optional[str] = None
+    unit_options: tuple = ()
+    required_unit: str = ""
+    default_unit: str = ""
+    min_value: float = 0.0
+    condition: Optional[Any] = None
+    dependents: tuple = ()
+
+    @property
+    def has_unit_options(self):
+        return self.type == "number" and bool(self.unit_options)
+
+    @classmethod
+    def from_config(cls, config):
+        unit_options = tuple(str(u) for u in config.get("unit_options") or ())
+        required_unit = config.get("required_unit", unit_options[0] if unit_options else "")
+        default_unit = unit_options[0] if unit_options else (required_unit or "")
+        return cls(
+            name=config["name"],
+            label=config.get("label", config["name"]),
+            type=config.get("type", "text"),
+            options=tuple(config.get("options") or ()),
+            default=config.get("default", ""),
+            value=config.get("value", ""),
+            required=bool(config.get("required", False)),
+            unit=config.get("unit"),
+            unit_options=unit_options,
+            required_unit=str(required_unit) if required_unit is not None else "",
+            default_unit=str(default_unit),
+            min_value=float(config.get("validation", {}).get("min", 0.0)),
+            condition=compile_condition(str(config["condition"])) if config.get("condition") else None,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class TableSpec:
+    name: str
+    label: str
+    columns: tuple
+    column_names: tuple
+    unit_columns: tuple
+
+    @property
+    def editor_columns(self):
+        """Column order shown in the data editor: values first, then unit selectors."""
+        return self.column_names + tuple(f"{col.name}_unit" for col in self.unit_columns)
+
+    @classmethod
+    def from_config(cls, config):
+        columns = tuple(FieldSpec.from_config(col) for col in config.get("columns") or ())
+        return cls(
+            name=config["name"],
+            label=config.get("label", config["name"]),
+            columns=columns,
+            column_names=tuple(col.name for col in columns),
+            unit_columns=tuple(col for col in columns if col.has_unit_options),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class FormSchema:
+    name: str
+    path: str
+    mtime: float
+    key_prefix: str
+    fields: tuple
+    tables: tuple
+    fields_after_tables: tuple
+    all_fields: tuple
+    required_fields: tuple
+
+    @classmethod
+    def from_config(cls, config, name, path, mtime, key_prefix=""):
+        fields = tuple(FieldSpec.from_config(f) for f in config.get("fields") or ())
+        after = tuple(FieldSpec.from_config(f) for f in config.get("fields_after_tables") or ())
+        # Attach (dependent name, condition) pairs to every field a condition reads
+        conditions = {f.name: f.condition for f in fields + after if f.condition}
+        graph = build_dependency_graph(conditions)
+        if graph:
+            def link(field):
+                dependents = tuple((name, conditions[name]) for name in graph.get(field.name, ()))
+                return replace(field, dependents=dependents) if dependents else field
+            fields = tuple(link(f) for f in fields)
+            after = tuple(link(f) for f in after)
+        all_fields = fields + after
+        return cls(
+            name=name,
+            path=path,
+            mtime=mtime,
+            key_prefix=key_prefix,
+            fields=fields,
+            tables=tuple(TableSpec.from_config(t) for t in config.get("tables") or ()),
+            fields_after_tables=after,
+            all_fields=all_fields,
+            required_fields=tuple(f.name for f in all_fields if f.required),
+        )
+
+
+# --- Registry state (process-wide) ---
+_lock = threading.RLock()
+_raw_cache = {}  # path -> (mtime, parsed YAML or None, error or None)
+_schema_cache = {}  # (path, name, key_prefix) -> FormSchema
+_load_errors = {}  # path -> error message
+_loaded = False
+
+
+def _parse(path):
+    """Parse a YAML file, reusing the cached result while its mtime is unchanged."""
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        error = f"YAML file not found: {path}"
+        _raw_cache.pop(path, None)
+        _load_errors[path] = error
+        return None, None, error
+    cached = _raw_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached
+    try:
+        with timing.span("yaml.load", file=os.path.basename(path)), open(path, "r", encoding="utf-8") as file:
+            config = yaml.load(file, Loader=YamlLoader)
+        error = None
+        if not isinstance(config, dict):
+            config, error = None, f"YAML file {path} does not contain a mapping"
+        else:
+            FormSchema.from_config(config, path, path, mtime)
+    except yaml.YAMLError as e:
+        config, error = None, f"Error parsing YAML file {path}: {e}"
+    except (ConditionError, KeyError) as e:
+        config, error = None, f"Invalid form definition in {path}: {e}"
+    if error:
+        logger.error(error)
+        _load_errors[path] = error
+    else:
+        _load_errors.pop(path, None)
+        if cached:
+            logger.info(f"Reloaded form schema {path}")
+    _raw_cache[path] = (mtime, config, error)
+    return _raw_cache[path]
+
+
+def _validate_index(index_file):
+    """Report index entries whose form file is missing or does not parse."""
+    entries = get_index(index_file)
+    for name, file_name in entries.items():
+        path = os.path.join(FORMS_DIR, file_name)
+        _, config, error = _parse(path)
+        if error:
+            message = f"{index_file}: '{name}' references {file_name}: {error}"
+            logger.error(message)
+            _load_errors[path] = message
+
+
+def load_all():
+    """Parse every file under forms/ and check the index references."""
+    global _loaded
+    with _lock:
+        for path in sorted(glob.glob(os.path.join(FORMS_DIR, "*.yaml"))):
+            _parse(path)
+        for index_file in INDEX_FILES:
+            _validate_index(index_file)
+        _loaded = True
+        if _load_errors:
+            logger.warning(f"Form registry loaded with {len(_load_errors)} problem(s)")
+        else:
+            logger.info(f"Form registry loaded {len(_raw_cache)} form files")
+
+
+def _ensure_loaded():
+    if not _loaded:
+        load_all()
+
+
+def get_load_errors():
+    """Return the problems found while loading the forms directory."""
+    with _lock:
+        _ensure_loaded()
+        return dict(_load_errors)
+
+
+def get_index(index_file):
+    """Return {form name: file name} for an index file, in index order."""
+    with _lock:
+        keys = INDEX_FILES[index_file]
+        _, config, _ = _parse(os.path.join(FORMS_DIR, index_file))
+        if not config:
+            return {}
+        return {item["name"]: item[keys["file"]] for item in config.get(keys["list"]) or ()}
+
+
+def get_form(file_name, name=None, key_prefix=""):
+    """Return the compiled FormSchema for a file under forms/, or None if it cannot be loaded."""
+    path = os.path.join(FORMS_DIR, file_name)
+    name = name or os.path.splitext(file_name)[0]
+    with _lock:
+        _ensure_loaded()
+        mtime, config, _ = _parse(path)
+        if config is None:
+            return None
+        schema = _schema_cache.get((path, name, key_prefix))
+        if schema is None or schema.mtime != mtime:
+            schema = FormSchema.from_config(config, name, path, mtime, key_prefix)
+            _schema_cache[(path, name, key_prefix)] = schema
+        return schema
+
+
+def get_subcategory_form(index_file, name):
+    """Return the FormSchema registered under `name` in an index file, or None."""
+    file_name = get_index(index_file).get(name)
+    if file_name is None:
+        return None
+    return get_form(file_name, name=name, key_prefix=make_key_prefix(name))
+
+
+def get_error(index_file, name):
+    """Return the recorded load error for an index entry, if any."""
+    file_name = get_index(index_file).get(name)
+    if file_name is None:
+        return f"No matching subcategory configuration found for {name} in {index_file}"
+    return get_load_errors().get(os.path.join(FORMS_DIR, file_name))
@@ -0,0 +1,273 @@
+import os
+import sys
+import time
+import zlib
+import logging
+import argparse
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+import form_registry
+import ippu_catalog
+import units
+
+logger = logging.getLogger(__name__)
+
+# Synthetic inventory data for load and scale testing, generated from the form
+# schemas and the category catalogs and written to a backend or to Parquet.
+#
+#   python generate_data.py --validated 1000000 --pending 5000 --parquet /tmp/inventory
+#   STORAGE_BACKEND=sqlite SQLITE_PATH=load.sqlite3 python generate_data.py --backend
+
+CHUNK_ROWS = 100_000
+SUBMISSION_WINDOW_DAYS = 180
+
+
+@dataclass(frozen=True, slots=True)
+class ColumnSpec:
+    name: str
+    kind: str  # "number", "fraction", "percent", "count", "factor" or "option"
+    options: tuple = ()
+    unit_options: tuple = ()
+    required_unit: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class TableSpec:
+    subcategory: str
+    subcategory_column: str
+    validation: str
+    validated: str  # empty for sectors without a validated table yet
+    columns: tuple
+
+
+def _kind(name, unit=""):
+    if "factor" in name or "/" in unit:
+        return "factor"
+    if "fraction" in name or unit == "fraction":
+        return "fraction"
+    if "percent" in name or unit == "%":
+        return "percent"
+    if name.endswith("_count") or unit in ("count", "units", "thousand units"):
+        return "count"
+    return "number"
+
+
+def _schema_columns(schema):
+    """Numeric and option columns of a form's fields and tables, without duplicates."""
+    columns = {}
+    for field in schema.all_fields + tuple(col for table in schema.tables for col in table.columns):
+        if field.name in columns:
+            continue
+        if field.type == "number":
+            unit = field.required_unit or (field.unit or "")
+            columns[field.name] = ColumnSpec(field.name, _kind(field.name, unit), unit_options=field.unit_options, required_unit=field.required_unit)
+        elif field.type in ("select", "radio") and field.options:
+            columns[field.name] = ColumnSpec(field.name, "option", options=tuple(map(str, field.options)))
+    return columns
+
+
+def _normalize(name):
+    return name.replace("–", "-").replace(" ", "")
+
+
+def ippu_tables():
+    """One spec per IPPU category: its catalog activity columns (KEY_FIELDS) plus the numeric and option fields of its form."""
+    index = {_normalize(name): name for name in form_registry.get_index("index.yaml") or {}}
+    specs = []
+    for subcategory, category in ippu_catalog.CATEGORIES.items():
+        columns = {}
+        form_name = index.get(_normalize(subcategory))
+        schema = form_registry.get_subcategory_form("index.yaml", form_name) if form_name else None
+        if schema is not None:
+            columns.update(_schema_columns(schema))
+        else:
+            logger.warning(f"No form schema for {subcategory}; generating its catalog columns only")
+        for activity in ippu_catalog.activities(subcategory):
+            if activity["Column"] not in columns:
+                columns[activity["Column"]] = ColumnSpec(activity["Column"], _kind(activity["Column"], activity["Units"]))
+        specs.append(TableSpec(subcategory, "ippu_subcategory", category["validation"], category["validated"], tuple(columns.values())))
+    return specs
+
+
+def waste_tables():
+    """One spec per waste form with a validation table; waste has no validated tables yet."""
+    from waste_form import VALIDATION_TABLES
+    specs = []
+    for subcategory, validation in VALIDATION_TABLES.items():
+        schema = form_registry.get_subcategory_form("index_w.yaml", subcategory)
+        if schema is None:
+            logger.warning(f"Skipping {subcategory}: {form_registry.get_error('index_w.yaml', subcategory)}")
+            continue
+        specs.append(TableSpec(subcategory, "waste_subcategory", validation, "", tuple(_schema_columns(schema).values())))
+    return specs
+
+
+def _column_rng(seed, table, column):
+    """A generator fixed by the seed and the column, so a column's distribution does not depend on chunking."""
+    return np.random.default_rng([seed, zlib.crc32(table.encode()), zlib.crc32(column.encode())])
+
+
+def _values(spec, column, rows, rng, seed, years, year_range, provider_scale):
+    """Draw one column for a chunk: log-normal quantities scaled per provider with a per-column yearly trend."""
+    shape = _column_rng(seed, spec.subcategory, column.name)
+    if column.kind == "option":
+        weights = shape.dirichlet(np.ones(len(column.options)))
+        return pd.Series(np.asarray(column.options, dtype=object)[rng.choice(len(column.options), size=rows, p=weights)])
+    if column.kind in ("fraction", "percent"):
+        a, b = shape.uniform(1.5, 6.0, size=2)
+        values = rng.beta(a, b, size=rows)
+        return pd.Series(values * 100 if column.kind == "percent" else values).round(4)
+    if column.kind == "factor":
+        # Emission factors and per-unit rates sit in a narrow band around a per-column default
+        return pd.Series(np.exp(shape.uniform(np.log(0.05), np.log(2.0))) * rng.lognormal(0.0, 0.15, size=rows)).round(4)
+    median = np.exp(shape.uniform(np.log(5), np.log(50_000)))
+    trend = (1 + shape.uniform(-0.02, 0.06)) ** (years - year_range[0])
+    expected = median * trend * provider_scale
+    if column.kind == "count":
+        return pd.Series(rng.poisson(np.maximum(expected / 100, 0.5)).astype(float))
+    values = expected * rng.lognormal(0.0, 0.5, size=rows)
+    if len(column.unit_options) > 1 and column.required_unit in units.UNITS:
+        # Providers enter some rows in other units; the value is rounded as entered, then stored in the required unit
+        options = [unit for unit in column.unit_options if units.dimension(unit) == units.dimension(column.required_unit)]
+        entered = np.asarray(options, dtype=object)[rng.integers(0, len(options), size=rows)]
+        factors = units.factors(entered, column.required_unit)
+        values = np.round(values / factors, 2) * factors
+    return pd.Series(values).round(4)
+
+
+def generate(spec, rows, status, year_range, providers, missing, seed, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrame chunks of rows for one table; status "Pending" makes validation-table rows."""
+    stream = 0 if status is None else 1
+    provider_rng = np.random.default_rng([seed, zlib.crc32(spec.subcategory.encode()), 2])
+    provider_scales = provider_rng.lognormal(0.0, 1.0, size=providers)
+    provider_names = np.array([f"Provider {i + 1:04d}" for i in range(providers)], dtype=object)
+    now = pd.Timestamp("2026-01-01")
+    for chunk, start in enumerate(range(0, rows, chunk_rows)):
+        size = min(chunk_rows, rows - start)
+        rng = np.random.default_rng([seed, zlib.crc32(spec.subcategory.encode()), stream, chunk])
+        years = rng.integers(year_range[0], year_range[1] + 1, size=size)
+        provider = rng.integers(0, providers, size=size)
+        data = {
+            "data_year": years,
+            spec.subcategory_column: spec.subcategory,
+            "data_provider": provider_names[provider],
+        }
+        for column in spec.columns:
+            values = _values(spec, column, size, rng, seed, years, year_range, provider_scales[provider])
+            # Single-choice selectors (the category fields) are always filled in
+            if missing and not (column.kind == "option" and len(column.options) == 1):
+                values = values.mask(rng.random(size) < missing)
+            data[column.name] = values.to_numpy()
+        if status is not None:
+            data["status"] = status
+            offsets = pd.to_timedelta(rng.integers(0, SUBMISSION_WINDOW_DAYS * 86400, size=size), unit="s")
+            data["submission_date"] = (now - offsets).strftime("%Y-%m-%dT%H:%M:%S")
+        yield pd.DataFrame(data)
+
+
+class ParquetSink:
+    """Writes each table to one Parquet file in directory, named as the table mirror names it, one row group per chunk."""
+
+    def __init__(self, directory):
+        import pyarrow  # noqa: F401  (pandas needs it for Parquet)
+        self.directory = directory
+        self._writers = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, table, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        frame = pa.Table.from_pandas(df, preserve_index=False)
+        writer = self._writers.get(table)
+        if writer is None:
+            slug = "".join(c if c.isalnum() else "_" for c in table)
+            path = os.path.join(self.directory, f"{slug}.parquet")
+            writer = self._writers[table] = pq.ParquetWriter(path, frame.schema)
+        else:
+            frame = frame.cast(writer.schema)
+        writer.write_table(frame)
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+
+
+class BackendSink:
+    """Inserts each chunk into the configured storage backend in bulk requests."""
+
+    def __init__(self, client, batch_size=None):
+        self.client = client
+        self.batch_size = batch_size
+        self._tables = set()
+
+    def write(self, table, df):
+        from supabase_client import insert_batched
+        records = df.astype(object).where(df.notna(), None).to_dict("records")
+        insert_batched(self.client, table, records, batch_size=self.batch_size)
+        self._tables.add(table)
+
+    def close(self):
+        from query_cache import invalidate_tables
+        invalidate_tables(*self._tables)
+
+
+def run(specs, sink, validated, pending, year_range, providers, missing, seed):
+    """Generate every table into the sink; returns {table: rows written}."""
+    written = {}
+    for spec in specs:
+        targets = [(spec.validated, validated, None), (spec.validation, pending, "Pending")]
+        for table, rows, status in targets:
+            if not table or not rows:
+                continue
+            for chunk in generate(spec, rows, status, year_range, providers, missing, seed):
+                sink.write(table, chunk)
+                written[table] = written.get(table, 0) + len(chunk)
+    sink.close()
+    return written
+
+
+def _year_range(text):
+    first, _, last = text.partition("-")
+    return int(first), int(last or first)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic validated and pending inventory records.")
+    parser.add_argument("--sector", choices=["ippu", "waste", "all"], default="all")
+    parser.add_argument("--validated", type=int, default=10_000, help="validated rows per category (default 10000)")
+    parser.add_argument("--pending", type=int, default=100, help="pending rows per category (default 100)")
+    parser.add_argument("--years", type=_year_range, default=(1995, 2024), help="year range, e.g. 1995-2024")
+    parser.add_argument("--providers", type=int, default=50, help="distinct data providers (default 50)")
+    parser.add_argument("--missing", type=float, default=0.05, help="share of values left empty (default 0.05)")
+    parser.add_argument("--seed", type=int, default=0)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--parquet", metavar="DIR", help="write one Parquet file per table to DIR")
+    target.add_argument("--backend", action="store_true", help="insert into the backend selected by STORAGE_BACKEND")
+    parser.add_argument("--batch-size", type=int, help="rows per insert request with --backend")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    specs = (ippu_tables() if args.sector in ("ippu", "all") else []) + (waste_tables() if args.sector in ("waste", "all") else [])
+    if args.parquet:
+        sink = ParquetSink(args.parquet)
+    else:
+        from supabase_client import get_supabase_client
+        client = get_supabase_client()
+        if client is None:
+            logger.error("No storage backend configured.")
+            return 1
+        sink = BackendSink(client, args.batch_size)
+
+    start = time.perf_counter()
+    written = run(specs, sink, args.validated, args.pending, args.years, args.providers, args.missing, args.seed)
+    elapsed = time.perf_counter() - start
+    total = sum(written.values())
+    for table, rows in written.items():
+        logger.info(f"{table}: {rows} rows")
+    logger.info(f"Wrote {total} rows to {len(written)} tables in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import logging
+from data_fetch import TableQuery
+
+logger = logging.getLogger(__name__)
+
+# One entry per IPPU category: its validation/validated tables and the activity
+# columns every view reads. KEY_FIELDS, TABLE_MAPPING, the dashboard numeric
+# fields and the collation activities are all derived from here.
+CATEGORIES = {
+    "2A3 - Glass Production": {
+        "code": "2A3",
+        "validation": "ipp_2a3_validation",
+        "validated": "2A3 - Glass Production",
+        "activities": [
+            {"Activity": "Glass Production", "Column": "mass_glass_produced_tonnes", "Units": "tonnes", "Notes": "Total mass of glass produced (IPCC 2006, Tier 1, Volume 3, Chapter 2.3)", "Aggregation": "sum"},
+            {"Activity": "Recycled Glass Fraction", "Column": "recycled_glass_fraction", "Units": "fraction", "Notes": "Fraction of recycled glass used in production", "Aggregation": "mean"},
+            {"Activity": "CO₂ Capture Volume", "Column": "co2_capture_volume_tonnes", "Units": "tonnes", "Notes": "CO₂ captured from glass production processes", "Aggregation": "sum"},
+            {"Activity": "Virgin Material Mass", "Column": "virgin_material_mass_tonnes", "Units": "tonnes", "Notes": "Mass of virgin material used in glass production", "Aggregation": "sum"},
+            {"Activity": "Carbonates Consumed", "Column": "carbonates_consumed_mass_tonnes", "Units": "tonnes", "Notes": "Mass of carbonates consumed, key for CO₂ emissions (IPCC 2006)", "Aggregation": "sum"},
+            {"Activity": "Emissions Factor", "Column": "emissions_factor_tco2", "Units": "tCO₂/tonne", "Notes": "Emissions factor for glass production", "Aggregation": "mean"}
+        ]
+    },
+    "2D - Non-Energy Products from Fuels and Solvent Use": {
+        "code": "2D",
+        "validation": "ipp_2d_validation",
+        "validated": "2D - Non-Energy Products from Fuels and Solvent Use",
+        "activities": [
+            {"Activity": "Motor Oils", "Column": "total_mass_motor_oils_tonnes", "Units": "tonnes", "Notes": "Mass of motor oils used (IPCC 2006, Tier 1, Volume 3, Chapter 5.4)", "Aggregation": "sum"},
+            {"Activity": "Industrial Oils", "Column": "total_mass_industrial_oils_tonnes", "Units": "tonnes", "Notes": "Mass of industrial oils used", "Aggregation": "sum"},
+            {"Activity": "Greases", "Column": "total_mass_greases_tonnes", "Units": "tonnes", "Notes": "Mass of greases used", "Aggregation": "sum"},
+            {"Activity": "Paraffin Wax", "Column": "mass_paraffin_wax_tonnes", "Units": "tonnes", "Notes": "Mass of paraffin wax used (IPCC 2006, Tier 1)", "Aggregation": "sum"}
+        ]
+    },
+    "2F – Product Uses as Substitutes for Ozone-Depleting Substances": {
+        "code": "2F",
+        "validation": "ipp_2f_validation",
+        "validated": "2F – Product Uses as Substitutes for Ozone-Depleting Substances",
+        "activities": [
+            {"Activity": "HFCs Supplied (Foam Blowing)", "Column": "mass_hfcs_supplied_tonnes", "Units": "tonnes", "Notes": "HFCs supplied for foam blowing agents (IPCC 2006, Tier 1, Volume 3, Chapter 7.2)", "Aggregation": "sum"},
+            {"Activity": "Gas Fire Protection", "Column": "mass_gas_fire_protection_tonnes", "Units": "tonnes", "Notes": "HFCs/PFCs used in fire protection equipment", "Aggregation": "sum"},
+            {"Activity": "HFCs Aerosols", "Column": "mass_hfcs_aerosols_tonnes", "Units": "tonnes", "Notes": "HFCs used in aerosols", "Aggregation": "sum"},
+            {"Activity": "Solvents HFCs/PFCs", "Column": "mass_solvents_hfcs_pfcs_tonnes", "Units": "tonnes", "Notes": "HFCs/PFCs used in solvents (IPCC 2006, Tier 1)", "Aggregation": "sum"}
+        ]
+    },
+    "2G1 – Electrical Equipment": {
+        "code": "2G1",
+        "validation": "ipp_2g1_validation",
+        "validated": "2G1 – Electrical Equipment",
+        "activities": [
+            {"Activity": "Fluorinated Gases Manufacturing", "Column": "fluorinated_gases_manufacturing_kg", "Units": "kg", "Notes": "SF6/PFC used in manufacturing electrical equipment (IPCC 2006, Tier 1, Volume 3, Chapter 7.3)", "Aggregation": "sum"},
+            {"Activity": "Fluorinated Gases Installation", "Column": "fluorinated_gases_installation_kg", "Units": "kg", "Notes": "SF6/PFC used during equipment installation", "Aggregation": "sum"},
+            {"Activity": "Fluorinated Gases Nameplate Capacity", "Column": "fluorinated_gases_nameplate_capacity_kg", "Units": "kg", "Notes": "Nameplate capacity of SF6/PFC in equipment", "Aggregation": "sum"}
+        ]
+    },
+    "2G2 – SF₆ and PFCs from Other Product Uses": {
+        "code": "2G2",
+        "validation": "ipp_2g2_validation",
+        "validated": "2G2 – SF₆ and PFCs from Other Product Uses",
+        "activities": [
+            {"Activity": "SF6/PFC Sales Other Uses", "Column": "sf6_pfc_sales_other_uses", "Units": "tonnes", "Notes": "SF6/PFC sales for non-electrical uses (IPCC 2006, Tier 1, Volume 3, Chapter 7.3)", "Aggregation": "sum"},
+            {"Activity": "AWACS Aircraft Count", "Column": "awacs_aircraft_count", "Units": "count", "Notes": "Number of AWACS aircraft using SF6/PFC", "Aggregation": "sum"},
+            {"Activity": "Research Particle Accelerators", "Column": "research_particle_accelerators_count", "Units": "count", "Notes": "Number of research particle accelerators using SF6/PFC", "Aggregation": "sum"},
+            {"Activity": "Industrial Particle Accelerators (High Voltage)", "Column": "industrial_particle_accelerators_high_voltage_count", "Units": "count", "Notes": "Number of high-voltage industrial accelerators", "Aggregation": "sum"},
+            {"Activity": "Industrial Particle Accelerators (Low Voltage)", "Column": "industrial_particle_accelerators_low_voltage_count", "Units": "count", "Notes": "Number of low-voltage industrial accelerators", "Aggregation": "sum"},
+            {"Activity": "Medical Radiotherapy Units", "Column": "medical_radiotherapy_units_count", "Units": "count", "Notes": "Number of radiotherapy units using SF6/PFC", "Aggregation": "sum"},
+            {"Activity": "Soundproof Windows Sales", "Column": "soundproof_windows_sales_volume", "Units": "volume", "Notes": "Sales volume of soundproof windows using SF6", "Aggregation": "sum"}
+        ]
+    },
+    "2G3 – N₂O from Product Uses": {
+        "code": "2G3",
+        "validation": "ipp_2g3_validation",
+        "validated": "2G3 – N₂O from Product Uses",
+        "activities": [
+            {"Activity": "N₂O Supplied", "Column": "mass_n2o_supplied_kg", "Units": "kg", "Notes": "N₂O supplied for product uses (IPCC 2006, Tier 1, Volume 3, Chapter 7.4)", "Aggregation": "sum"}
+        ]
+    },
+    "2H1 - Pulp and Paper Industry": {
+        "code": "2H1",
+        "validation": "ipp_2h1_validation",
+        "validated": "2H1 - Pulp and Paper Industry",
+        "activities": [
+            {"Activity": "Dry Pulp Produced", "Column": "dry_pulp_produced_tonnes", "Units": "tonnes", "Notes": "Dry pulp produced in pulp and paper industry (IPCC 2006, Tier 1, Volume 3, Chapter 7.5)", "Aggregation": "sum"}
+        ]
+    },
+    "2H2 - Food and Beverages Industry": {
+        "code": "2H2",
+        "validation": "ipp_2h2_validation",
+        "validated": "2H2 - Food and Beverages Industry",
+        "activities": [
+            {"Activity": "Food/Beverage Produced", "Column": "food_beverage_produced_tonnes", "Units": "tonnes", "Notes": "Food and beverage production (IPCC 2006, Tier 1, Volume 3, Chapter 7.5)", "Aggregation": "sum"}
+        ]
+    }
+}
+
+# Columns a view reads on top of a category's activity columns
+VIEW_COLUMNS = {
+    "validated": ("data_year",),
+    "pending": ("id", "status", "submission_date", "data_year"),
+}
+
+
+def activities(subcategory):
+    """Return the activity entries (Activity, Column, Units, Notes, Aggregation) for a category."""
+    return CATEGORIES.get(subcategory, {}).get("activities", [])
+
+
+def activity_columns(subcategory):
+    """Return the numeric activity columns of a category, in catalog order."""
+    return [activity["Column"] for activity in activities(subcategory)]
+
+
+def category_code(subcategory):
+    return CATEGORIES[subcategory]["code"] if subcategory in CATEGORIES else subcategory.split(" - ")[0]
+
+
+def select_columns(subcategory, view="validated"):
+    """Return the PostgREST select list a view needs from a category's table."""
+    columns = list(VIEW_COLUMNS[view])
+    columns += [column for column in activity_columns(subcategory) if column not in columns]
+    return ",".join(columns)
+
+
+def validated_query(subcategory, year_range=None):
+    """Return the query for a category's validated rows, limited server-side to year_range."""
+    filters = ()
+    if year_range is not None:
+        filters = (("gte", "data_year", int(year_range[0])), ("lte", "data_year", int(year_range[1])))
+    return TableQuery(CATEGORIES[subcategory]["validated"], columns=select_columns(subcategory), filters=filters)
+
+
+def pending_query(subcategory, count=None):
+    """Return the query for a category's pending submissions, oldest first; with count, only their number."""
+    filters = (("eq", "status", "Pending"),)
+    if count:
+        return TableQuery(CATEGORIES[subcategory]["validation"], columns="id", filters=filters, count=count)
+    return TableQuery(
+        CATEGORIES[subcategory]["validation"],
+        columns=select_columns(subcategory, "pending"),
+        filters=filters,
+        order=(("submission_date", False),)
+    )
+
+
+def year_bound_queries(subcategory):
+    """Return (min, max) queries that each read a single data_year from a category's validated table."""
+    table = CATEGORIES[subcategory]["validated"]
+    not_null = (("filter", "data_year", "not.is", "null"),)
+    return (
+        TableQuery(table, columns="data_year", filters=not_null, order=(("data_year", False),), limit=1),
+        TableQuery(table, columns="data_year", filters=not_null, order=(("data_year", True),), limit=1),
+    )
@@ -0,0 +1,159 @@
+import logging
+import numpy as np
+import pandas as pd
+from data_fetch import aggregate_tables
+import ippu_catalog
+
+logger = logging.getLogger(__name__)
+
+GASES = ["CO2", "N2O", "HFC", "PFC", "SF6"]
+
+# IPCC 2006 Tier 1 default factors, keyed by category and activity column. Each
+# factor gives tonnes of gas per unit of the column's activity (kg columns are
+# converted here). "FactorColumn" is a per-row factor that replaces the default
+# when reported, applied to "FactorBasisColumn" instead of the activity when one
+# is named; "FractionColumn" is a per-row fraction that reduces emissions
+# computed with the default factor.
+# 2H (pulp and paper, food and beverages) has no direct-GHG Tier 1 method in
+# IPCC 2006 (only biogenic CO2 and NMVOC), so it contributes no emissions.
+FACTORS = {
+    "2A3 - Glass Production": {
+        # Eq. 2.10: Mg x EF x (1 - CR), default EF 0.20 tCO2/t glass (Vol. 3, Ch. 2.4);
+        # a reported factor is tCO2/t carbonate and applies to the carbonates consumed
+        "mass_glass_produced_tonnes": {
+            "Gas": "CO2", "Factor": 0.20, "FractionColumn": "recycled_glass_fraction",
+            "FactorColumn": "emissions_factor_tco2", "FactorBasisColumn": "carbonates_consumed_mass_tonnes"
+        }
+    },
+    "2D - Non-Energy Products from Fuels and Solvent Use": {
+        # Eq. 5.2: mass x CC (20 kg C/GJ x 40.2 GJ/t) x ODU x 44/12 (Vol. 3, Ch. 5.2-5.3)
+        "total_mass_motor_oils_tonnes": {"Gas": "CO2", "Factor": 0.804 * 0.2 * 44 / 12},
+        "total_mass_industrial_oils_tonnes": {"Gas": "CO2", "Factor": 0.804 * 0.2 * 44 / 12},
+        "total_mass_greases_tonnes": {"Gas": "CO2", "Factor": 0.804 * 0.05 * 44 / 12},
+        "mass_paraffin_wax_tonnes": {"Gas": "CO2", "Factor": 0.804 * 0.2 * 44 / 12}
+    },
+    "2F – Product Uses as Substitutes for Ozone-Depleting Substances": {
+        # Emission-factor approach: share of the year's supply emitted in that year (Vol. 3, Ch. 7)
+        "mass_hfcs_supplied_tonnes": {"Gas": "HFC", "Factor": 0.10},
+        "mass_gas_fire_protection_tonnes": {"Gas": "HFC", "Factor": 0.02},
+        "mass_hfcs_aerosols_tonnes": {"Gas": "HFC", "Factor": 0.50},
+        "mass_solvents_hfcs_pfcs_tonnes": {"Gas": "HFC", "Factor": 0.50}
+    },
+    "2G1 – Electrical Equipment": {
+        # Default emission factors for sealed-pressure equipment (Vol. 3, Ch. 8.2), kg -> t
+        "fluorinated_gases_manufacturing_kg": {"Gas": "SF6", "Factor": 0.085 / 1000},
+        "fluorinated_gases_installation_kg": {"Gas": "SF6", "Factor": 0.01 / 1000},
+        "fluorinated_gases_nameplate_capacity_kg": {"Gas": "SF6", "Factor": 0.026 / 1000}
+    },
+    "2G2 – SF₆ and PFCs from Other Product Uses": {
+        # Prompt emissive uses and per-unit defaults (Vol. 3, Ch. 8.3): sales are
+        # stored in tonnes and fully emitted, per-unit charges are kg -> t;
+        # soundproof window sales are reported by volume, which has no default
+        "sf6_pfc_sales_other_uses": {"Gas": "SF6", "Factor": 1.0},
+        "awacs_aircraft_count": {"Gas": "SF6", "Factor": 740 / 1000},
+        "research_particle_accelerators_count": {"Gas": "SF6", "Factor": 2400 * 0.07 / 1000},
+        "industrial_particle_accelerators_high_voltage_count": {"Gas": "SF6", "Factor": 1300 * 0.07 / 1000},
+        "industrial_particle_accelerators_low_voltage_count": {"Gas": "SF6", "Factor": 115 * 0.013 / 1000},
+        "medical_radiotherapy_units_count": {"Gas": "SF6", "Factor": 0.5 * 2.0 / 1000}
+    },
+    "2G3 – N₂O from Product Uses": {
+        # All N2O supplied is emitted (Vol. 3, Ch. 8.4), kg -> t
+        "mass_n2o_supplied_kg": {"Gas": "N2O", "Factor": 1.0 / 1000}
+    },
+    "2H1 - Pulp and Paper Industry": {},
+    "2H2 - Food and Beverages Industry": {}
+}
+
+RESULT_COLUMNS = ["Subcategory", "data_year", "Gas", "Emissions"]
+
+
+def _factor_terms(subcategory, columns):
+    """Return the factor terms of a category whose activity column is present in columns."""
+    key_fields = ippu_catalog.activity_columns(subcategory)
+    return [
+        (column, term) for column, term in FACTORS.get(subcategory, {}).items()
+        if column in key_fields and column in columns
+    ]
+
+
+def _numeric(df, column, fill):
+    if column not in df.columns:
+        return np.full(len(df), fill, dtype=float)
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float, na_value=fill)
+
+
+def _row_terms(df, column, term):
+    """Return a term's (activity, factor) for every row.
+
+    Rows with a reported factor use it on the basis column (the activity when
+    none is named) without the fraction; other rows use the default factor
+    reduced by the fraction."""
+    activity = _numeric(df, column, 0.0)
+    factors = np.full(len(df), term["Factor"], dtype=float)
+    if "FractionColumn" in term:
+        factors = factors * (1 - np.clip(_numeric(df, term["FractionColumn"], 0.0), 0, 1))
+    if "FactorColumn" in term:
+        reported = _numeric(df, term["FactorColumn"], np.nan)
+        given = ~np.isnan(reported)
+        factors = np.where(given, reported, factors)
+        if "FactorBasisColumn" in term:
+            activity = np.where(given, _numeric(df, term["FactorBasisColumn"], 0.0), activity)
+    return activity, factors
+
+
+def calculate(subcategory, df):
+    """Return the tonnes of each gas emitted per data_year by a category's validated rows.
+
+    All rows and factor terms are computed as one (rows x terms) array product;
+    missing activity values count as zero."""
+    terms = _factor_terms(subcategory, df.columns)
+    if not terms or "data_year" not in df.columns or df.empty:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    rows = [_row_terms(df, column, term) for column, term in terms]
+    activity = np.column_stack([row_activity for row_activity, _ in rows])
+    factors = np.column_stack([row_factors for _, row_factors in rows])
+    # One-hot (terms x gases) matrix that sums each term into its gas
+    gas_matrix = np.array([[term["Gas"] == gas for gas in GASES] for _, term in terms], dtype=float)
+    by_gas = (activity * factors) @ gas_matrix
+
+    years = pd.to_numeric(df["data_year"], errors="coerce")
+    valid = years.notna().to_numpy()
+    totals = pd.DataFrame(by_gas[valid], columns=GASES).groupby(years[valid].astype(int).to_numpy()).sum()
+    totals = totals.loc[:, gas_matrix.any(axis=0)]
+    totals.index.name = "data_year"
+    result = totals.reset_index().melt(id_vars="data_year", var_name="Gas", value_name="Emissions")
+    return result.assign(Subcategory=subcategory)[RESULT_COLUMNS]
+
+
+def _combine(results):
+    results = [result for result in results if result is not None and not result.empty]
+    if not results:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    combined = pd.concat(results, ignore_index=True)
+    return combined.groupby(RESULT_COLUMNS[:-1], as_index=False, sort=True)["Emissions"].sum()
+
+
+def _emissions_step(subcategory, totals, chunk):
+    return _combine([totals, calculate(subcategory, chunk)])
+
+
+def emission_totals(supabase, subcategories=None):
+    """Return (per category, year and gas emissions for the validated tables, fetch errors).
+
+    Each table is computed chunk by chunk and the totals are kept in the query
+    cache until the table is written to, so dashboards read precomputed
+    figures rather than recomputing them on every render."""
+    subcategories = subcategories or list(FACTORS)
+    queries = {subcategory: ippu_catalog.validated_query(subcategory) for subcategory in subcategories if FACTORS.get(subcategory)}
+    results, errors = aggregate_tables(supabase, queries, _emissions_step, name="emissions")
+    return _combine(results.values()), errors
+
+
+def emissions_for(totals, subcategory, year_range=None, gas=None):
+    """Select one category's totals, optionally limited to a year range and a gas, from emission_totals()."""
+    selected = totals[totals["Subcategory"] == subcategory]
+    if year_range is not None:
+        selected = selected[selected["data_year"].between(year_range[0], year_range[1])]
+    if gas is not None:
+        selected = selected[selected["Gas"] == gas]
+    return selected.reset_index(drop=True)
@@ -0,0 +1,193 @@
+import os
+import glob
+import time
+import pickle
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+
+logger = logging.getLogger(__name__)
+
+# Memory budget for cached query results, shared by every session in this process
+QUERY_CACHE_MAX_BYTES = int(os.environ.get("QUERY_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Validated tables only change through transfer_records_to_validated_table(), which invalidates them,
+# so they can live much longer than the validation tables providers write to
+QUERY_CACHE_TTL = float(os.environ.get("QUERY_CACHE_TTL", "900"))
+QUERY_CACHE_VALIDATION_TTL = float(os.environ.get("QUERY_CACHE_VALIDATION_TTL", "60"))
+# Evicted entries are pickled here when set; leave unset to disable disk spill
+QUERY_CACHE_SPILL_DIR = os.environ.get("QUERY_CACHE_SPILL_DIR")
+
+# Per-table TTL overrides in seconds
+TABLE_TTLS = {}
+
+
+def table_ttl(table):
+    """Return the TTL in seconds for results read from a table."""
+    if table in TABLE_TTLS:
+        return TABLE_TTLS[table]
+    if table.endswith("_validation"):
+        return QUERY_CACHE_VALIDATION_TTL
+    return QUERY_CACHE_TTL
+
+
+def _frame_bytes(df):
+    """Memory held by a frame, counting the contents of string cells, not just their pointers."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class QueryCache:
+    """LRU cache of query DataFrames keyed by TableQuery, bounded by memory use."""
+
+    def __init__(self, max_bytes=QUERY_CACHE_MAX_BYTES, spill_dir=QUERY_CACHE_SPILL_DIR):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self._entries = OrderedDict()  # key -> (stored_at, DataFrame, size)
+        self._spilled = {}  # key -> spill file path
+        self._bytes = 0
+        self._versions = defaultdict(int)  # table -> number of invalidations so far
+        self._generation = 0  # bumped by clear()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "disk_hits": 0, "evictions": 0, "invalidations": 0}
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            # Spill files from an earlier process are not indexed and may be stale
+            for path in glob.glob(os.path.join(spill_dir, "*.pkl")):
+                os.remove(path)
+
+    def _spill_path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_dir, f"{digest}.pkl")
+
+    def _drop_spill(self, key):
+        path = self._spilled.pop(key, None)
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            key, (stored_at, df, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.stats["evictions"] += 1
+            if self.spill_dir:
+                path = self._spill_path(key)
+                try:
+                    with open(path, "wb") as file:
+                        pickle.dump((stored_at, df), file, protocol=pickle.HIGHEST_PROTOCOL)
+                    self._spilled[key] = path
+                except OSError as e:
+                    logger.warning(f"Failed to spill cached query for {key.table}: {e}")
+
+    def _load_spilled(self, key):
+        path = self._spilled.get(key)
+        if not path:
+            return None
+        try:
+            with open(path, "rb") as file:
+                stored_at, df = pickle.load(file)
+        except (OSError, pickle.UnpicklingError) as e:
+            logger.warning(f"Failed to read spilled query for {key.table}: {e}")
+            self._drop_spill(key)
+            return None
+        self._drop_spill(key)
+        return stored_at, df
+
+    def get(self, key):
+        """Return a copy of the cached DataFrame for key, or None on a miss or expiry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            from_disk = False
+            if entry is None:
+                spilled = self._load_spilled(key)
+                if spilled is not None:
+                    stored_at, df = spilled
+                    entry = (stored_at, df, _frame_bytes(df))
+                    from_disk = True
+            if entry is None or time.monotonic() - entry[0] > table_ttl(key.table):
+                if entry is not None and not from_disk:
+                    self._entries.pop(key)
+                    self._bytes -= entry[2]
+                self.stats["misses"] += 1
+                return None
+            if from_disk:
+                self._entries[key] = entry
+                self._bytes += entry[2]
+                self.stats["disk_hits"] += 1
+                self._evict()
+            else:
+                self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1].copy()
+
+    def put(self, key, df, version=None):
+        """Store a DataFrame for key; callers keep their own copy.
+
+        version is the table's version() from before the rows were read; if the
+        table has been invalidated since, the rows may predate the write and are
+        not stored."""
+        size = _frame_bytes(df)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if version is not None and version != (self._generation, self._versions[key.table]):
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._drop_spill(key)
+            self._entries[key] = (time.monotonic(), df.copy(), size)
+            self._bytes += size
+            self._evict()
+
+    def invalidate_table(self, table):
+        """Drop every cached result read from table, in memory and on disk."""
+        with self._lock:
+            self._versions[table] += 1
+            for key in [k for k in self._entries if k.table == table]:
+                self._bytes -= self._entries.pop(key)[2]
+                self.stats["invalidations"] += 1
+            for key in [k for k in self._spilled if k.table == table]:
+                self._drop_spill(key)
+                self.stats["invalidations"] += 1
+
+    def version(self, table):
+        """Return a token that changes whenever table is invalidated, for derived caches."""
+        with self._lock:
+            return self._generation, self._versions[table]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            for key in list(self._spilled):
+                self._drop_spill(key)
+            self._bytes = 0
+
+    def snapshot(self):
+        """Return the hit/miss counters plus current size."""
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), spilled=len(self._spilled), bytes=self._bytes)
+
+
+query_cache = QueryCache()
+
+
+# Called with the table name whenever the app writes to a table
+_invalidation_listeners = []
+
+
+def add_invalidation_listener(listener):
+    _invalidation_listeners.append(listener)
+
+
+def invalidate_tables(*tables):
+    """Invalidate the cached results of every given table after the app wrote to it."""
+    for table in tables:
+        query_cache.invalidate_table(table)
+        for listener in _invalidation_listeners:
+            listener(table)
+        logger.info(f"Invalidated cached queries for {table}")
+
+
+def cache_stats():
+    return query_cache.snapshot()
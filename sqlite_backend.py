@@ -0,0 +1,399 @@
+import json
+import logging
+import sqlite3
+import threading
+
+try:
+    from postgrest.exceptions import APIError
+except Exception:
+    class APIError(Exception):
+        """Stand-in for postgrest's APIError when supabase is not installed."""
+
+        def __init__(self, error):
+            self.message = error.get("message")
+            self.code = error.get("code")
+            super().__init__(self.message)
+
+logger = logging.getLogger(__name__)
+
+# Columns indexed as soon as a table has them; the views filter on both
+INDEXED_COLUMNS = ("status", "data_year")
+
+_COMPARISONS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+class SQLiteResponse:
+    """Same shape as a postgrest APIResponse: rows in `data`, optional `count`."""
+
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+    def __repr__(self):
+        return f"SQLiteResponse(data={self.data!r}, count={self.count!r})"
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _encode(value):
+    """SQLite stores scalars only; lists and dicts are kept as JSON text."""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+def _api_error(e, code="PGRST000"):
+    return APIError({"message": str(e), "code": code, "hint": None, "details": None})
+
+
+class SQLiteQuery:
+    """The subset of the postgrest query builder used by the app, run against SQLite."""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table_name = table
+        self._action = None
+        self._columns = "*"
+        self._payload = None
+        self._count = None
+        self._head = False
+        self._where = []
+        self._params = []
+        self._order = []
+        self._limit = None
+        self._offset = None
+        self._referenced = set()  # columns used by filters and ordering
+
+    # --- Actions ---
+    def select(self, *columns, count=None, head=None):
+        self._action = "select"
+        self._columns = ",".join(columns) if columns else "*"
+        self._count = count
+        self._head = bool(head)
+        return self
+
+    def insert(self, json, *, count=None, returning=None, upsert=False, default_to_null=True):
+        self._action = "insert"
+        self._payload = json if isinstance(json, list) else [json]
+        self._default_to_null = default_to_null
+        return self
+
+    def update(self, json, *, count=None, returning=None):
+        self._action = "update"
+        self._payload = json
+        return self
+
+    def delete(self, *, count=None, returning=None):
+        self._action = "delete"
+        return self
+
+    # --- Filters ---
+    def _compare(self, column, op, value):
+        self._referenced.add(column)
+        self._where.append(f"{_quote(column)} {op} ?")
+        self._params.append(_encode(value))
+        return self
+
+    def eq(self, column, value):
+        return self._compare(column, "=", value)
+
+    def neq(self, column, value):
+        return self._compare(column, "!=", value)
+
+    def gt(self, column, value):
+        return self._compare(column, ">", value)
+
+    def gte(self, column, value):
+        return self._compare(column, ">=", value)
+
+    def lt(self, column, value):
+        return self._compare(column, "<", value)
+
+    def lte(self, column, value):
+        return self._compare(column, "<=", value)
+
+    def in_(self, column, values):
+        self._referenced.add(column)
+        values = list(values)
+        if not values:
+            self._where.append("0")
+            return self
+        self._where.append(f"{_quote(column)} IN ({','.join('?' * len(values))})")
+        self._params.extend(_encode(value) for value in values)
+        return self
+
+    def is_(self, column, value):
+        if value not in (None, "null"):
+            raise _api_error(f"Unsupported is_ value: {value}")
+        self._referenced.add(column)
+        self._where.append(f"{_quote(column)} IS NULL")
+        return self
+
+    def filter(self, column, operator, criteria):
+        """Raw PostgREST filters: `<op>` or `not.<op>` with a comparison or `is` operator."""
+        self._referenced.add(column)
+        negate = operator.startswith("not.")
+        op = operator[4:] if negate else operator
+        if op == "is" and criteria == "null":
+            clause = f"{_quote(column)} IS NULL"
+        elif op in _COMPARISONS:
+            clause = f"{_quote(column)} {_COMPARISONS[op]} ?"
+            self._params.append(criteria)
+        else:
+            raise _api_error(f"Unsupported filter operator: {operator}")
+        self._where.append(f"NOT ({clause})" if negate else clause)
+        return self
+
+    # --- Modifiers ---
+    def order(self, column, *, desc=False, nullsfirst=False, foreign_table=None):
+        # PostgreSQL puts NULLs last ascending and first descending unless told otherwise
+        self._referenced.add(column)
+        nulls_first = nullsfirst or desc
+        self._order.append(f"({_quote(column)} IS NULL) {'DESC' if nulls_first else 'ASC'}, {_quote(column)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, size, *, foreign_table=None):
+        self._limit = size
+        return self
+
+    def range(self, start, end, foreign_table=None):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    # --- Execution ---
+    def _where_sql(self):
+        return f" WHERE {' AND '.join(self._where)}" if self._where else ""
+
+    def _selected(self):
+        if self._columns.strip() == "*":
+            return []
+        return [column.strip() for column in self._columns.split(",") if column.strip()]
+
+    def _select_list(self):
+        return ", ".join(map(_quote, self._selected())) or "*"
+
+    def _check_columns(self, conn):
+        # SQLite reads an unknown double-quoted name as a string literal, so check names up front
+        wanted = self._referenced | set(self._selected())
+        missing = wanted - self.client.table_columns(conn, self.table_name)
+        if missing:
+            # Another process may have added the column since it was cached
+            missing = wanted - self.client.table_columns(conn, self.table_name, refresh=True)
+        if missing:
+            raise _api_error(f"column {self.table_name}.{sorted(missing)[0]} does not exist", code="42703")
+
+    def execute(self):
+        try:
+            if self._action == "insert":
+                self.client.ensure_table(self.table_name, {key for row in self._payload for key in row})
+            elif self._action == "update":
+                self.client.ensure_table(self.table_name, set(self._payload))
+            with self.client.transaction(write=self._action != "select") as conn:
+                if self._action == "insert":
+                    return self._execute_insert(conn)
+                if not self.client.table_exists(conn, self.table_name):
+                    # Tables are created by their first insert; until then they read as empty
+                    return SQLiteResponse([], 0 if self._count else None)
+                self._check_columns(conn)
+                if self._action == "select":
+                    return self._execute_select(conn)
+                if self._action == "update":
+                    return self._execute_update(conn)
+                if self._action == "delete":
+                    return self._execute_delete(conn)
+                raise _api_error(f"No action given for table {self.table_name}")
+        except sqlite3.Error as e:
+            raise _api_error(e) from e
+
+    def _execute_select(self, conn):
+        table = _quote(self.table_name)
+        count = None
+        if self._count:
+            count = conn.execute(f"SELECT COUNT(*) FROM {table}{self._where_sql()}", self._params).fetchone()[0]
+        if self._head:
+            return SQLiteResponse([], count)
+        sql = f"SELECT {self._select_list()} FROM {table}{self._where_sql()}"
+        if self._order:
+            sql += f" ORDER BY {', '.join(self._order)}"
+        if self._limit is not None:
+            sql += f" LIMIT {int(self._limit)}"
+            if self._offset:
+                sql += f" OFFSET {int(self._offset)}"
+        return SQLiteResponse([dict(row) for row in conn.execute(sql, self._params)], count)
+
+    def _execute_insert(self, conn):
+        rows = [{key: _encode(value) for key, value in row.items()} for row in self._payload]
+        if not rows:
+            return SQLiteResponse([])
+        table = _quote(self.table_name)
+        if self._default_to_null:
+            keys = sorted({key for row in rows for key in row})
+            rows = [{key: row.get(key) for key in keys} for row in rows]
+        inserted = []
+        for row in rows:
+            columns = list(row)
+            if columns:
+                sql = f"INSERT INTO {table} ({', '.join(map(_quote, columns))}) VALUES ({', '.join('?' * len(columns))}) RETURNING *"
+            else:
+                sql = f"INSERT INTO {table} DEFAULT VALUES RETURNING *"
+            inserted.append(dict(conn.execute(sql, [row[column] for column in columns]).fetchone()))
+        return SQLiteResponse(inserted, len(inserted))
+
+    def _execute_update(self, conn):
+        values = {key: _encode(value) for key, value in self._payload.items()}
+        assignments = ", ".join(f"{_quote(key)} = ?" for key in values)
+        sql = f"UPDATE {_quote(self.table_name)} SET {assignments}{self._where_sql()} RETURNING *"
+        return SQLiteResponse([dict(row) for row in conn.execute(sql, list(values.values()) + self._params)])
+
+    def _execute_delete(self, conn):
+        sql = f"DELETE FROM {_quote(self.table_name)}{self._where_sql()} RETURNING *"
+        return SQLiteResponse([dict(row) for row in conn.execute(sql, self._params)])
+
+
+# Columns kept by a validation table for the review workflow only
+_TRANSFER_EXCLUDE_FIELDS = ("id", "status", "submission_date", "updated_at")
+
+
+def _missing_required(row, columns):
+    for column in columns:
+        value = row.get(column)
+        if value is None or (isinstance(value, (int, float)) and value <= 0):
+            return True
+    return False
+
+
+def _transfer_to_validated(client, source_table, target_table, record_ids, required_columns=()):
+    """Local equivalent of the transfer_to_validated database function (see supabase/migrations)."""
+    ids = [int(record_id) for record_id in record_ids]
+    with client.transaction() as conn:
+        if not ids or not client.table_exists(conn, source_table):
+            return []
+        columns = [column for column in sorted(client.table_columns(conn, source_table, refresh=True)) if column not in _TRANSFER_EXCLUDE_FIELDS]
+    client.ensure_table(target_table, columns)
+    # One write transaction: the rows are read, deleted and inserted under the same lock
+    with client.transaction(write=True) as conn:
+        sql = f"SELECT * FROM {_quote(source_table)} WHERE id IN ({','.join('?' * len(ids))}) AND status = 'Pending' ORDER BY id"
+        moved = [dict(row) for row in conn.execute(sql, ids)]
+        moved = [row for row in moved if not _missing_required(row, required_columns)]
+        if not moved:
+            return []
+        moved_ids = [row["id"] for row in moved]
+        conn.execute(f"DELETE FROM {_quote(source_table)} WHERE id IN ({','.join('?' * len(moved_ids))})", moved_ids)
+        if columns:
+            sql = f"INSERT INTO {_quote(target_table)} ({', '.join(map(_quote, columns))}) VALUES ({', '.join('?' * len(columns))})"
+            conn.executemany(sql, [[row.get(column) for column in columns] for row in moved])
+        else:
+            conn.executemany(f"INSERT INTO {_quote(target_table)} DEFAULT VALUES", [()] * len(moved))
+        return moved
+
+
+# Database functions callable through rpc(), mirroring the Postgres functions of the same name
+FUNCTIONS = {
+    "transfer_to_validated": _transfer_to_validated,
+}
+
+
+class SQLiteRPC:
+    """A pending rpc() call; runs the named function on execute() like postgrest's RPC builder."""
+
+    def __init__(self, client, name, params):
+        self.client = client
+        self.name = name
+        self.params = params or {}
+
+    def execute(self):
+        if self.name not in FUNCTIONS:
+            raise _api_error(f"Could not find the function public.{self.name}", code="PGRST202")
+        try:
+            return SQLiteResponse(FUNCTIONS[self.name](self.client, **self.params))
+        except sqlite3.Error as e:
+            raise _api_error(e) from e
+
+
+class SQLiteClient:
+    """Drop-in for the Supabase client's `table()` API backed by one SQLite file.
+
+    Each worker thread gets its own connection; the database runs in WAL mode
+    so readers never block the writer."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._columns = {}  # table -> set of known columns
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def transaction(self, write=False):
+        return _Transaction(self._connection(), write)
+
+    def table(self, name):
+        return SQLiteQuery(self, name)
+
+    def from_(self, name):
+        return self.table(name)
+
+    def rpc(self, name, params=None):
+        return SQLiteRPC(self, name, params)
+
+    def table_columns(self, conn, table, refresh=False):
+        known = self._columns.get(table)
+        if known is None or refresh:
+            known = {row["name"] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")}
+            self._columns[table] = known
+        return known
+
+    def table_exists(self, conn, table):
+        if table in self._columns:
+            return True
+        row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        return row is not None
+
+    def ensure_table(self, table, columns):
+        """Create the table or add columns on first use, indexing status/data_year when present.
+
+        Schema changes commit on their own so a failed write cannot roll back
+        a column this client already believes exists."""
+        with self._schema_lock:
+            known = self._columns.get(table)
+            if known is not None and not set(columns) - known:
+                return
+            with self.transaction(write=True) as conn:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table)} (id INTEGER PRIMARY KEY AUTOINCREMENT)")
+                # Re-read the schema: another process may have added columns meanwhile
+                known = {row["name"] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")}
+                for column in sorted(set(columns) - known):
+                    conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)}")
+                    known.add(column)
+                for column in INDEXED_COLUMNS:
+                    if column in known:
+                        index = _quote(f"{table}_{column}_idx")
+                        conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {_quote(table)} ({_quote(column)})")
+            self._columns[table] = known
+
+
+class _Transaction:
+    """One transaction around a query, rolled back on error; writers take the lock up front."""
+
+    def __init__(self, conn, write):
+        self.conn = conn
+        self.write = write
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE" if self.write else "BEGIN")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -0,0 +1,60 @@
+-- Store data_year as a plain integer and index it so the compiler views can
+-- push year-range (gte/lte) and status filters down to PostgREST.
+-- Older submissions stored data_year as a one-element array; the first
+-- element is kept.
+do $$
+declare
+    tbl text;
+    col_type text;
+begin
+    foreach tbl in array array[
+        '2A3 - Glass Production',
+        '2D - Non-Energy Products from Fuels and Solvent Use',
+        '2F – Product Uses as Substitutes for Ozone-Depleting Substances',
+        '2G1 – Electrical Equipment',
+        '2G2 – SF₆ and PFCs from Other Product Uses',
+        '2G3 – N₂O from Product Uses',
+        '2H1 - Pulp and Paper Industry',
+        '2H2 - Food and Beverages Industry',
+        'ipp_2a3_validation',
+        'ipp_2d_validation',
+        'ipp_2e_validation',
+        'ipp_2f_validation',
+        'ipp_2g1_validation',
+        'ipp_2g2_validation',
+        'ipp_2g3_validation',
+        'ipp_2h1_validation',
+        'ipp_2h2_validation',
+        'waste_4a1a_validation',
+        'waste_4a1b_validation',
+        'waste_4a2_validation',
+        'waste_4a3_validation',
+        'waste_4b_validation',
+        'waste_4c1_validation',
+        'waste_4c2_validation',
+        'waste_4d_validation',
+        'waste_4e_validation'
+    ]
+    loop
+        select data_type into col_type
+        from information_schema.columns
+        where table_schema = 'public' and table_name = tbl and column_name = 'data_year';
+
+        if col_type is null then
+            raise notice 'Skipping %: no data_year column', tbl;
+            continue;
+        end if;
+
+        if col_type = 'ARRAY' then
+            execute format('alter table public.%I alter column data_year type integer using data_year[1]::integer', tbl);
+        elsif col_type <> 'integer' then
+            execute format('alter table public.%I alter column data_year type integer using nullif(data_year::text, '''')::integer', tbl);
+        end if;
+
+        execute format('create index if not exists %I on public.%I (data_year)', left(tbl, 50) || '_data_year_idx', tbl);
+
+        if tbl like '%\_validation' then
+            execute format('create index if not exists %I on public.%I (status, data_year)', left(tbl, 50) || '_status_idx', tbl);
+        end if;
+    end loop;
+end $$;
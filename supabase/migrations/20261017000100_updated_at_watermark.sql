@@ -0,0 +1,49 @@
+-- Add an updated_at watermark to every table the compiler views read so the
+-- local table mirror (table_mirror.py) can pull only rows written since its
+-- last sync. Deleted rows are dropped by reading the deleted_rows tombstones
+-- written since then (see the deleted_rows_tombstones migration).
+create or replace function public.set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at = now();
+    return new;
+end;
+$$;
+
+do $$
+declare
+    tbl text;
+begin
+    foreach tbl in array array[
+        '2A3 - Glass Production',
+        '2D - Non-Energy Products from Fuels and Solvent Use',
+        '2F – Product Uses as Substitutes for Ozone-Depleting Substances',
+        '2G1 – Electrical Equipment',
+        '2G2 – SF₆ and PFCs from Other Product Uses',
+        '2G3 – N₂O from Product Uses',
+        '2H1 - Pulp and Paper Industry',
+        '2H2 - Food and Beverages Industry',
+        'ipp_2a3_validation',
+        'ipp_2d_validation',
+        'ipp_2e_validation',
+        'ipp_2f_validation',
+        'ipp_2g1_validation',
+        'ipp_2g2_validation',
+        'ipp_2g3_validation',
+        'ipp_2h1_validation',
+        'ipp_2h2_validation'
+    ]
+    loop
+        if to_regclass(format('public.%I', tbl)) is null then
+            raise notice 'Skipping %: table does not exist', tbl;
+            continue;
+        end if;
+
+        execute format('alter table public.%I add column if not exists updated_at timestamptz not null default now()', tbl);
+        execute format('create index if not exists %I on public.%I (updated_at, id)', left(tbl, 48) || '_updated_at_idx', tbl);
+        execute format('drop trigger if exists set_updated_at on public.%I', tbl);
+        execute format('create trigger set_updated_at before update on public.%I for each row execute function public.set_updated_at()', tbl);
+    end loop;
+end $$;
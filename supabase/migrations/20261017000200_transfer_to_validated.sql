@@ -0,0 +1,55 @@
+-- Move pending records from a validation table to its validated table in one
+-- transaction, so a compiler's validation is a single request and a record can
+-- never end up in both tables or in neither.
+--
+-- Only rows that are still Pending and whose required_columns are all present,
+-- non-null and (when numeric) positive are moved; the others stay where they
+-- are. Returns the moved validation rows, so callers can tell which ids moved.
+-- The local SQLite backend implements the same function (sqlite_backend.py).
+create or replace function public.transfer_to_validated(
+    source_table text,
+    target_table text,
+    record_ids bigint[],
+    required_columns text[] default '{}'
+)
+returns setof jsonb
+language plpgsql
+as $$
+declare
+    cols text;
+begin
+    -- Copy every column the two tables share except the validation bookkeeping
+    select string_agg(quote_ident(target.column_name), ', ' order by target.ordinal_position)
+    into cols
+    from information_schema.columns target
+    join information_schema.columns source
+        on source.table_schema = 'public'
+        and source.table_name = source_table
+        and source.column_name = target.column_name
+    where target.table_schema = 'public'
+        and target.table_name = target_table
+        and target.column_name not in ('id', 'status', 'submission_date', 'updated_at');
+
+    if cols is null then
+        raise exception 'No columns to transfer from % to %', source_table, target_table;
+    end if;
+
+    return query execute format(
+        'with moved as (
+            delete from public.%I as v
+            where v.id = any($1)
+                and v.status = ''Pending''
+                and not exists (
+                    select 1 from unnest($2) as r(col)
+                    where coalesce(to_jsonb(v) -> r.col, ''null''::jsonb) = ''null''::jsonb
+                        or (jsonb_typeof(to_jsonb(v) -> r.col) = ''number'' and (to_jsonb(v) ->> r.col)::numeric <= 0)
+                )
+            returning v.*
+        ), inserted as (
+            insert into public.%I (%s) select %s from moved
+        )
+        select to_jsonb(moved) from moved',
+        source_table, target_table, cols, cols
+    ) using record_ids, required_columns;
+end;
+$$;
@@ -0,0 +1,57 @@
+-- Record every row deleted from the tables the compiler views read, so the
+-- local table mirror (table_mirror.py) can drop deleted rows by reading the
+-- tombstones written since its last sync instead of every id of the table.
+-- Tombstones older than the oldest mirror watermark are no longer read and can
+-- be pruned.
+create table if not exists public.deleted_rows (
+    id bigint generated always as identity primary key,
+    table_name text not null,
+    row_id bigint not null,
+    deleted_at timestamptz not null default now()
+);
+
+create index if not exists deleted_rows_table_deleted_at_idx on public.deleted_rows (table_name, deleted_at);
+
+create or replace function public.record_deleted_row()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into public.deleted_rows (table_name, row_id) values (tg_table_name, old.id);
+    return old;
+end;
+$$;
+
+do $$
+declare
+    tbl text;
+begin
+    foreach tbl in array array[
+        '2A3 - Glass Production',
+        '2D - Non-Energy Products from Fuels and Solvent Use',
+        '2F – Product Uses as Substitutes for Ozone-Depleting Substances',
+        '2G1 – Electrical Equipment',
+        '2G2 – SF₆ and PFCs from Other Product Uses',
+        '2G3 – N₂O from Product Uses',
+        '2H1 - Pulp and Paper Industry',
+        '2H2 - Food and Beverages Industry',
+        'ipp_2a3_validation',
+        'ipp_2d_validation',
+        'ipp_2e_validation',
+        'ipp_2f_validation',
+        'ipp_2g1_validation',
+        'ipp_2g2_validation',
+        'ipp_2g3_validation',
+        'ipp_2h1_validation',
+        'ipp_2h2_validation'
+    ]
+    loop
+        if to_regclass(format('public.%I', tbl)) is null then
+            raise notice 'Skipping %: table does not exist', tbl;
+            continue;
+        end if;
+
+        execute format('drop trigger if exists record_deleted_row on public.%I', tbl);
+        execute format('create trigger record_deleted_row after delete on public.%I for each row execute function public.record_deleted_row()', tbl);
+    end loop;
+end $$;
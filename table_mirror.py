@@ -0,0 +1,214 @@
+import os
+import json
+import logging
+import threading
+import pandas as pd
+import streamlit as st
+from query_cache import add_invalidation_listener, query_cache
+
+logger = logging.getLogger(__name__)
+
+# Local Parquet mirror of the tables the views read; leave unset to read from Supabase directly
+MIRROR_DIR = os.environ.get("TABLE_MIRROR_DIR")
+MIRROR_SYNC_INTERVAL = float(os.environ.get("TABLE_MIRROR_SYNC_INTERVAL", "60"))
+# Column whose value increases whenever a row is written (see supabase/migrations)
+WATERMARK_COLUMN = os.environ.get("TABLE_MIRROR_WATERMARK_COLUMN", "updated_at")
+SYNC_PAGE_SIZE = int(os.environ.get("TABLE_MIRROR_PAGE_SIZE", "1000"))
+# Table the delete triggers write (table_name, row_id, deleted_at) tombstones to (see supabase/migrations)
+TOMBSTONE_TABLE = os.environ.get("TABLE_MIRROR_TOMBSTONE_TABLE", "deleted_rows")
+
+_WATERMARKS_FILE = "_watermarks.json"
+
+
+def _not_null(df, column, operator, criteria):
+    if (operator, criteria) != ("not.is", "null"):
+        raise NotImplementedError(f"filter {column} {operator}.{criteria}")
+    return df[column].notna()
+
+
+# Filters the mirror can evaluate locally; anything else is sent to Supabase
+_FILTERS = {
+    "eq": lambda df, column, value: df[column] == value,
+    "neq": lambda df, column, value: df[column] != value,
+    "gt": lambda df, column, value: df[column] > value,
+    "gte": lambda df, column, value: df[column] >= value,
+    "lt": lambda df, column, value: df[column] < value,
+    "lte": lambda df, column, value: df[column] <= value,
+    "in_": lambda df, column, values: df[column].isin(list(values)),
+    "filter": _not_null,
+}
+
+
+def apply_query(df, query):
+    """Evaluate a TableQuery against a local frame; raises NotImplementedError or KeyError if it cannot."""
+    for method, column, *args in query.filters:
+        if method not in _FILTERS:
+            raise NotImplementedError(method)
+        df = df[_FILTERS[method](df, column, *args).fillna(False).astype(bool)]
+    if query.order:
+        df = df.sort_values(
+            [column for column, _ in query.order],
+            ascending=[not desc for _, desc in query.order],
+            na_position="last"
+        )
+    if query.limit is not None:
+        df = df.head(query.limit)
+    if query.columns != "*":
+        df = df[[column.strip() for column in query.columns.split(",")]]
+    return df.reset_index(drop=True)
+
+
+class TableMirror:
+    """Parquet copies of Supabase tables, kept current by watermark-based delta syncs."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._frames = {}  # table -> DataFrame, replaced wholesale on each sync
+        self._dirty = {}  # table -> writes by this process not yet picked up by a sync
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        self._watermarks = self._load_watermarks()
+        for table in self._watermarks:
+            path = self._path(table)
+            if os.path.exists(path):
+                self._frames[table] = pd.read_parquet(path)
+
+    def _path(self, table):
+        slug = "".join(c if c.isalnum() else "_" for c in table)
+        return os.path.join(self.directory, f"{slug}.parquet")
+
+    def _load_watermarks(self):
+        path = os.path.join(self.directory, _WATERMARKS_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def _save_watermarks(self):
+        path = os.path.join(self.directory, _WATERMARKS_FILE)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(self._watermarks, file, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+    def mark_dirty(self, table):
+        """Serve table from Supabase until the next sync has picked up this process's writes."""
+        with self._lock:
+            if table in self._watermarks:
+                self._dirty[table] = self._dirty.get(table, 0) + 1
+        self._wake.set()
+
+    def read(self, query):
+        """Return the rows for query from the mirror, or None if the mirror cannot answer it."""
+        with self._lock:
+            if query.table not in self._watermarks:
+                # First read of a table registers it for syncing
+                self._watermarks[query.table] = None
+                self._wake.set()
+                return None
+            if query.table in self._dirty or query.table not in self._frames:
+                return None
+            df = self._frames[query.table]
+        try:
+            return apply_query(df, query)
+        except (NotImplementedError, KeyError, TypeError) as e:
+            logger.debug(f"Mirror cannot answer query on {query.table}: {e}")
+            return None
+
+    def _pull(self, supabase, table, watermark):
+        """Page through rows written at or after watermark (all rows when None)."""
+        rows, start = [], 0
+        while True:
+            request = supabase.table(table).select("*")
+            if watermark is not None:
+                request = request.gte(WATERMARK_COLUMN, watermark).order(WATERMARK_COLUMN)
+            response = request.order("id").range(start, start + SYNC_PAGE_SIZE - 1).execute()
+            rows.extend(response.data or [])
+            if len(response.data or []) < SYNC_PAGE_SIZE:
+                return pd.DataFrame(rows)
+            start += SYNC_PAGE_SIZE
+
+    def _deleted_ids(self, supabase, table, watermark):
+        """Page through the ids of rows deleted from table at or after watermark."""
+        ids, start = set(), 0
+        while True:
+            response = (
+                supabase.table(TOMBSTONE_TABLE).select("row_id")
+                .eq("table_name", table).gte("deleted_at", watermark)
+                .order("id").range(start, start + SYNC_PAGE_SIZE - 1).execute()
+            )
+            ids.update(row["row_id"] for row in response.data or [])
+            if len(response.data or []) < SYNC_PAGE_SIZE:
+                return ids
+            start += SYNC_PAGE_SIZE
+
+    def sync_table(self, supabase, table):
+        """Merge rows changed since the stored watermark and drop rows deleted since it.
+
+        Returns True if the mirrored rows changed. Tables without the watermark
+        column are refreshed in full."""
+        with self._lock:
+            watermark = self._watermarks.get(table)
+            current = self._frames.get(table)
+            writes = self._dirty.get(table, 0)
+        delta = self._pull(supabase, table, watermark)
+        if current is None or watermark is None:
+            merged = delta
+        else:
+            merged = pd.concat([current, delta], ignore_index=True)
+            if "id" in merged.columns:
+                merged = merged.drop_duplicates(subset="id", keep="last")
+            if not merged.empty and "id" in merged.columns:
+                merged = merged[~merged["id"].isin(self._deleted_ids(supabase, table, watermark))]
+        merged = merged.reset_index(drop=True)
+
+        changed = current is None or not merged.equals(current)
+        new_watermark = None
+        if WATERMARK_COLUMN in merged.columns and merged[WATERMARK_COLUMN].notna().any():
+            new_watermark = str(merged[WATERMARK_COLUMN].max())
+        if changed:
+            merged.to_parquet(f"{self._path(table)}.tmp", index=False)
+            os.replace(f"{self._path(table)}.tmp", self._path(table))
+        with self._lock:
+            self._frames[table] = merged
+            self._watermarks[table] = new_watermark
+            # Writes made while this sync ran keep the table dirty until the next one
+            if self._dirty.get(table, 0) == writes:
+                self._dirty.pop(table, None)
+            self._save_watermarks()
+        return changed
+
+    def sync(self, supabase):
+        """Sync every registered table; a failing table keeps its last good copy."""
+        with self._lock:
+            tables = list(self._watermarks)
+        for table in tables:
+            try:
+                if self.sync_table(supabase, table):
+                    query_cache.invalidate_table(table)
+                    logger.info(f"Mirror synced {table}: {len(self._frames[table])} rows")
+            except Exception as e:
+                logger.warning(f"Mirror sync failed for {table}: {getattr(e, 'message', e)}")
+
+    def run(self, supabase):
+        while True:
+            self.sync(supabase)
+            self._wake.wait(MIRROR_SYNC_INTERVAL)
+            self._wake.clear()
+
+
+mirror = TableMirror(MIRROR_DIR) if MIRROR_DIR else None
+
+if mirror is not None:
+    add_invalidation_listener(mirror.mark_dirty)
+
+
+@st.cache_resource(show_spinner=False)
+def start_sync(_supabase):
+    """Start the background delta sync once per process; a no-op when the mirror is disabled."""
+    if mirror is None:
+        return None
+    thread = threading.Thread(target=mirror.run, args=(_supabase,), name="table-mirror-sync", daemon=True)
+    thread.start()
+    logger.info(f"Started table mirror sync into {MIRROR_DIR} every {MIRROR_SYNC_INTERVAL}s")
+    return thread
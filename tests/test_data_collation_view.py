@@ -0,0 +1,43 @@
+import pandas as pd
+import form_registry
+import ippu_catalog
+import units
+from data_collation_view import collate, slice_years
+
+SF6 = "2G2 – SF₆ and PFCs from Other Product Uses"
+
+
+def _stored_units():
+    """required_unit of every IPPU form field, by column name."""
+    stored = {}
+    for name in form_registry.get_index("index.yaml"):
+        schema = form_registry.get_subcategory_form("index.yaml", name)
+        for field in schema.all_fields if schema else ():
+            if field.required_unit:
+                stored[field.name] = field.required_unit
+    return stored
+
+
+def test_catalog_units_match_stored_units():
+    stored = _stored_units()
+    for subcategory in ippu_catalog.CATEGORIES:
+        for activity in ippu_catalog.activities(subcategory):
+            column = activity["Column"]
+            if column in stored and activity["Units"] in units.UNITS:
+                assert activity["Units"] == stored[column], column
+
+
+def test_2g2_sales_keep_their_stored_magnitude():
+    frames = {SF6: pd.DataFrame({"data_year": [2020, 2020], "sf6_pfc_sales_other_uses": [2.5, 1.5]})}
+    matrix, is_sum = collate(frames)
+    row = slice_years(matrix, is_sum, (2020, 2020)).set_index("Activity").loc["SF6/PFC Sales Other Uses"]
+    assert row["Units"] == "tonnes"
+    assert row["2020"] == 4.0
+
+
+def test_kg_columns_are_reported_in_tonnes():
+    frames = {"2G3 – N₂O from Product Uses": pd.DataFrame({"data_year": [2020], "mass_n2o_supplied_kg": [1500.0]})}
+    matrix, is_sum = collate(frames)
+    row = slice_years(matrix, is_sum, (2020, 2020)).set_index("Activity").loc["N₂O Supplied"]
+    assert row["Units"] == "tonnes"
+    assert row["2020"] == 1.5
@@ -0,0 +1,37 @@
+import pandas as pd
+import data_fetch
+from data_fetch import AggregateKey, TableQuery, aggregate_tables, fetch_tables
+from query_cache import invalidate_tables, query_cache
+
+
+def _reader(invalidate):
+    def read(supabase, query, *args):
+        if invalidate:
+            # A submission lands while the rows are being read
+            invalidate_tables(query.table)
+        return pd.DataFrame({"data_year": [2020]})
+    return read
+
+
+def test_fetch_is_cached(monkeypatch):
+    query = TableQuery("fetch_cached")
+    monkeypatch.setattr(data_fetch, "fetch_table", _reader(False))
+    frames, errors = fetch_tables(None, {"t": query})
+    assert not errors and len(frames["t"]) == 1
+    assert query_cache.get(query) is not None
+
+
+def test_fetch_across_an_invalidation_is_not_cached(monkeypatch):
+    query = TableQuery("fetch_invalidated")
+    monkeypatch.setattr(data_fetch, "fetch_table", _reader(True))
+    frames, errors = fetch_tables(None, {"t": query})
+    assert not errors and len(frames["t"]) == 1
+    assert query_cache.get(query) is None
+
+
+def test_aggregate_across_an_invalidation_is_not_cached(monkeypatch):
+    query = TableQuery("aggregate_invalidated")
+    monkeypatch.setattr(data_fetch, "aggregate_table", _reader(True))
+    results, errors = aggregate_tables(None, {"t": query}, step=None, name="totals")
+    assert not errors and len(results["t"]) == 1
+    assert query_cache.get(AggregateKey(query, "totals")) is None
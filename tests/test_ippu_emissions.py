@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+from ippu_emissions import calculate
+
+GLASS = "2A3 - Glass Production"
+SF6 = "2G2 – SF₆ and PFCs from Other Product Uses"
+
+
+def _emissions(subcategory, gas, **columns):
+    result = calculate(subcategory, pd.DataFrame({"data_year": [2020], **{name: [value] for name, value in columns.items()}}))
+    return result.loc[result["Gas"] == gas, "Emissions"].sum()
+
+
+def test_sf6_sales_in_tonnes_emit_the_same_tonnes():
+    assert _emissions(SF6, "SF6", sf6_pfc_sales_other_uses=1.0) == pytest.approx(1.0)
+
+
+def test_glass_default_factor_uses_glass_mass_and_cullet_ratio():
+    emissions = _emissions(GLASS, "CO2", mass_glass_produced_tonnes=1000.0, recycled_glass_fraction=0.25,
+                           carbonates_consumed_mass_tonnes=300.0, emissions_factor_tco2=float("nan"))
+    assert emissions == pytest.approx(1000.0 * 0.20 * 0.75)
+
+
+def test_glass_reported_factor_applies_to_carbonates_without_cullet_ratio():
+    emissions = _emissions(GLASS, "CO2", mass_glass_produced_tonnes=1000.0, recycled_glass_fraction=0.25,
+                           carbonates_consumed_mass_tonnes=300.0, emissions_factor_tco2=0.44)
+    assert emissions == pytest.approx(300.0 * 0.44)
@@ -0,0 +1,33 @@
+import pandas as pd
+from data_fetch import TableQuery
+from query_cache import QueryCache, _frame_bytes
+
+
+def _pending_frame(rows=1000):
+    return pd.DataFrame({
+        "id": range(rows),
+        "status": "Pending",
+        "ippu_subcategory": "2G2 – SF₆ and PFCs from Other Product Uses",
+        "submission_date": "2026-01-01T00:00:00",
+        "data_provider": [f"Provider {i:04d} of industrial process data" for i in range(rows)],
+    })
+
+
+def test_frame_bytes_counts_string_contents():
+    df = _pending_frame()
+    assert _frame_bytes(df) > 5 * df.memory_usage(index=True, deep=False).sum()
+
+
+def test_string_frames_are_evicted_and_spilled_at_the_limit(tmp_path):
+    df = _pending_frame()
+    size = int(df.memory_usage(index=True, deep=True).sum())
+    cache = QueryCache(max_bytes=int(size * 2.5), spill_dir=str(tmp_path))
+    queries = [TableQuery(f"ipp_test_{i}_validation") for i in range(4)]
+    for query in queries:
+        cache.put(query, df)
+    snapshot = cache.snapshot()
+    assert snapshot["bytes"] <= cache.max_bytes
+    assert snapshot["entries"] == 2
+    assert snapshot["evictions"] == 2 and snapshot["spilled"] == 2
+    assert cache.get(queries[0]) is not None
+    assert cache.snapshot()["disk_hits"] == 1
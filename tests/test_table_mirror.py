@@ -0,0 +1,21 @@
+from sqlite_backend import SQLiteClient
+from table_mirror import TOMBSTONE_TABLE, TableMirror
+
+TABLE = "ipp_2g3_validation"
+
+
+def test_sync_drops_rows_with_a_tombstone(tmp_path):
+    client = SQLiteClient(str(tmp_path / "store.sqlite3"))
+    client.table(TABLE).insert([
+        {"data_year": 2020 + i, "updated_at": f"2026-01-01T00:00:0{i}"} for i in range(3)
+    ]).execute()
+    mirror = TableMirror(str(tmp_path / "mirror"))
+    mirror._watermarks[TABLE] = None
+    mirror.sync_table(client, TABLE)
+    assert sorted(mirror._frames[TABLE]["id"]) == [1, 2, 3]
+
+    client.table(TABLE).delete().eq("id", 2).execute()
+    client.table(TOMBSTONE_TABLE).insert([{"table_name": TABLE, "row_id": 2, "deleted_at": "2026-01-01T00:00:05"}]).execute()
+    client.table(TABLE).insert([{"data_year": 2030, "updated_at": "2026-01-01T00:00:06"}]).execute()
+    assert mirror.sync_table(client, TABLE)
+    assert sorted(mirror._frames[TABLE]["id"]) == [1, 3, 4]
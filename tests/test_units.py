@@ -0,0 +1,24 @@
+import form_registry
+import units
+
+
+def _unit_fields():
+    for index_file in ("index.yaml", "index_w.yaml"):
+        for name in form_registry.get_index(index_file) or {}:
+            schema = form_registry.get_subcategory_form(index_file, name)
+            if schema is None:
+                continue
+            for field in schema.all_fields:
+                if field.has_unit_options and field.required_unit:
+                    yield name, field
+
+
+def test_every_offered_unit_converts_to_the_required_unit():
+    unconvertible = []
+    for name, field in _unit_fields():
+        for unit in field.unit_options:
+            try:
+                units.factor(unit, field.required_unit)
+            except units.UnitError as e:
+                unconvertible.append(f"{name} {field.name}: {e}")
+    assert not unconvertible
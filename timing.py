@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import threading
+import functools
+import contextvars
+import pandas as pd
+import streamlit as st
+
+# Per-rerun timing spans, shown in a developer panel under each page. Off unless
+# PERF_TRACE is set; when off, span() returns a shared no-op and traced
+# functions call straight through.
+PERF_TRACE = os.environ.get("PERF_TRACE", "").lower() in ("1", "true", "yes", "on")
+# Rows listed in the span tree; totals always cover every span
+PANEL_MAX_ROWS = int(os.environ.get("PERF_PANEL_MAX_ROWS", "300"))
+
+_current = contextvars.ContextVar("timing_span", default=None)
+_tree_lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "duration", "bytes", "rows", "children")
+
+    def __init__(self, name, attrs=None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.start = time.perf_counter()
+        self.duration = None
+        self.bytes = 0
+        self.rows = 0
+        self.children = []
+
+    def walk(self, depth=0):
+        yield depth, self
+        for child in list(self.children):
+            yield from child.walk(depth + 1)
+
+
+class _NullSpan:
+    """Returned by span() while tracing is off or outside a traced page."""
+    enabled = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add(self, rows=0, bytes=0):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _ActiveSpan:
+    enabled = True
+
+    def __init__(self, name, parent, attrs):
+        self.span = Span(name, attrs)
+        self.parent = parent
+        self.token = None
+
+    def __enter__(self):
+        with _tree_lock:
+            self.parent.children.append(self.span)
+        self.token = _current.set(self.span)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.duration = time.perf_counter() - self.span.start
+        _current.reset(self.token)
+        return False
+
+    def add(self, rows=0, bytes=0):
+        self.span.rows += rows
+        self.span.bytes += bytes
+
+
+def span(name, **attrs):
+    """Time a block as a child of the current span: `with span("backend.select", table=t) as s: ... s.add(rows=n)`."""
+    if not PERF_TRACE:
+        return _NULL_SPAN
+    parent = _current.get()
+    if parent is None:
+        return _NULL_SPAN
+    return _ActiveSpan(name, parent, attrs)
+
+
+def traced(name):
+    """Decorator form of span() for a whole function."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not PERF_TRACE:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def bind(fn):
+    """Return fn bound to the current span, for work handed to a thread pool."""
+    if not PERF_TRACE or _current.get() is None:
+        return fn
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+def payload_bytes(payload):
+    """Size of a request or response body as JSON; only worth computing while tracing."""
+    return len(json.dumps(payload, default=str).encode("utf-8"))
+
+
+def traced_page(name):
+    """Decorator for a page function: time its rerun and show the span tree below it."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not PERF_TRACE:
+                return fn(*args, **kwargs)
+            root = Span(name)
+            token = _current.set(root)
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                root.duration = time.perf_counter() - root.start
+                _current.reset(token)
+            render_panel(root)
+            return result
+        return wrapper
+    return decorate
+
+
+def _describe(span):
+    detail = ", ".join(f"{key}={value}" for key, value in span.attrs.items())
+    return f"{span.name} ({detail})" if detail else span.name
+
+
+def render_panel(root):
+    """Show a rerun's span tree and per-span totals in a collapsed expander."""
+    spans = list(root.walk())
+    with st.expander(f"⏱ Performance: {root.name} took {root.duration * 1000:.0f} ms"):
+        tree = pd.DataFrame([
+            {
+                "Span": "\u2003" * depth + _describe(span),
+                "ms": None if span.duration is None else span.duration * 1000,
+                "Rows": span.rows or None,
+                "Bytes": span.bytes or None,
+            }
+            for depth, span in spans[:PANEL_MAX_ROWS]
+        ])
+        backend = [span for _, span in spans if span.name.startswith("backend.")]
+        st.caption(
+            f"{len(spans) - 1} spans, {len(backend)} backend requests, "
+            f"{sum(span.bytes for span in backend) / 1024:.1f} KiB transferred"
+            + (f"; first {PANEL_MAX_ROWS} spans listed" if len(spans) > PANEL_MAX_ROWS else "")
+        )
+        st.dataframe(tree, use_container_width=True, hide_index=True, column_config={
+            "ms": st.column_config.NumberColumn("ms", format="%.1f"),
+        })
+        totals = pd.DataFrame(
+            [(span.name, span.duration or 0.0, span.rows, span.bytes) for _, span in spans[1:]],
+            columns=["Span", "seconds", "Rows", "Bytes"]
+        )
+        if not totals.empty:
+            totals = totals.groupby("Span", as_index=False).agg(
+                Count=("seconds", "size"), ms=("seconds", "sum"), Rows=("Rows", "sum"), Bytes=("Bytes", "sum")
+            )
+            totals["ms"] *= 1000
+            st.dataframe(totals.sort_values("ms", ascending=False), use_container_width=True, hide_index=True, column_config={
+                "ms": st.column_config.NumberColumn("Total ms", format="%.1f"),
+            })
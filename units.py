@@ -0,0 +1,120 @@
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+
+class UnitError(ValueError):
+    """Raised for units that are not registered or that measure different dimensions."""
+
+
+@dataclass(frozen=True, slots=True)
+class Unit:
+    name: str
+    dimension: str
+    scale: float  # size of one unit in its dimension's base unit
+
+
+# Every unit the forms and catalog use, grouped by dimension. Carbon mass is its
+# own dimension so "kg C" can never be converted to or from a plain mass.
+# Rates and temperatures are registered so they validate, but only convert to themselves.
+UNITS = {unit.name: unit for unit in (
+    Unit("g", "mass", 1e-3),
+    Unit("kg", "mass", 1.0),
+    Unit("lb", "mass", 0.45359237),
+    Unit("tonnes", "mass", 1e3),
+    Unit("t", "mass", 1e3),
+    Unit("kt", "mass", 1e6),
+    Unit("Gg", "mass", 1e6),
+    Unit("Mt", "mass", 1e9),
+    Unit("kg C", "carbon mass", 1.0),
+    Unit("tonnes C", "carbon mass", 1e3),
+    Unit("Gg C", "carbon mass", 1e6),
+    Unit("litres", "volume", 1e-3),
+    Unit("L", "volume", 1e-3),
+    Unit("kL", "volume", 1.0),
+    Unit("m³", "volume", 1.0),
+    Unit("ML", "volume", 1e3),
+    Unit("fraction", "ratio", 1.0),
+    Unit("%", "ratio", 0.01),
+    Unit("count", "count", 1.0),
+    Unit("units", "count", 1.0),
+    Unit("thousand units", "count", 1e3),
+    Unit("tCO₂/tonne", "emission factor", 1.0),
+    Unit("kg/person/day", "per capita rate", 1.0),
+    Unit("kg/person/year", "per capita rate", 1.0 / 365),
+    Unit("kg/bed/day", "per bed rate", 1.0),
+    Unit("°C", "temperature", 1.0),
+)}
+
+# Factor for every convertible (from, to) pair, computed once at import
+_FACTORS = {
+    (source.name, target.name): source.scale / target.scale
+    for source in UNITS.values() for target in UNITS.values()
+    if source.dimension == target.dimension
+}
+
+
+def dimension(unit):
+    """Return the dimension of a registered unit, or None for an unregistered one."""
+    registered = UNITS.get(unit)
+    return registered.dimension if registered else None
+
+
+def factor(from_unit, to_unit):
+    """Return the number that converts a value in from_unit to to_unit."""
+    if from_unit == to_unit:
+        return 1.0
+    try:
+        return _FACTORS[(from_unit, to_unit)]
+    except KeyError:
+        for unit in (from_unit, to_unit):
+            if unit not in UNITS:
+                raise UnitError(f"Unknown unit '{unit}'") from None
+        raise UnitError(
+            f"Cannot convert {from_unit} ({UNITS[from_unit].dimension}) to {to_unit} ({UNITS[to_unit].dimension})"
+        ) from None
+
+
+def factors(from_units, to_unit):
+    """Return the factor for every unit in from_units, looking each distinct unit up once."""
+    names, inverse = np.unique(np.asarray(from_units, dtype=object).astype(str), return_inverse=True)
+    return np.array([factor(name, to_unit) for name in names], dtype=float)[inverse.reshape(-1)]
+
+
+def convert(values, from_unit, to_unit):
+    """Convert a scalar, array or Series from from_unit to to_unit.
+
+    from_unit is either one unit or one unit per value. Values that are not
+    numeric become NaN (None for a scalar); units of another dimension raise
+    UnitError rather than passing values through unchanged."""
+    if np.ndim(values) == 0:
+        value = pd.to_numeric(pd.Series([values]), errors="coerce").to_numpy(dtype=float)[0]
+        return None if np.isnan(value) else float(value * factor(from_unit, to_unit))
+    numeric = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+    scale = factor(from_unit, to_unit) if isinstance(from_unit, str) else factors(from_unit, to_unit)
+    converted = numeric * scale
+    if isinstance(values, pd.Series):
+        return pd.Series(converted, index=values.index, name=values.name)
+    return converted
+
+
+def normalize_units(df, columns):
+    """Convert every unit-selectable column of df to its required unit.
+
+    columns are the form's FieldSpecs with unit options; each value column is
+    read with its "<name>_unit" column (missing units are the column's default)
+    and converted in one pass. Returns (the converted copy of df, a list of
+    (column, units converted from) for the columns that changed)."""
+    df = df.copy()
+    converted = []
+    for col in columns:
+        if col.name not in df.columns:
+            continue
+        unit_key = f"{col.name}_unit"
+        from_units = df[unit_key].fillna(col.default_unit).replace("", col.default_unit) if unit_key in df.columns else pd.Series(col.default_unit, index=df.index)
+        changed = from_units != col.required_unit
+        if changed.any():
+            df[col.name] = convert(df[col.name], from_units.to_numpy(), col.required_unit)
+            converted.append((col, sorted(from_units[changed].astype(str).unique())))
+        df[unit_key] = col.required_unit
+    return df, converted
@@ -0,0 +1,164 @@
+import io
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import streamlit as st
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from data_collation_view import ROW_COLUMNS, full_range_matrix, slice_years
+from data_fetch import iter_table
+from query_cache import query_cache
+import ippu_catalog
+
+logger = logging.getLogger(__name__)
+
+NUMBER_FORMAT = "#,##0.00"
+
+# Exports are written off the session thread, one at a time; each session keeps
+# its latest one in its session state for download
+_export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+EXPORT_STATE_KEY = "ippu_export"
+
+
+def _sheet_title(name):
+    """Excel sheet names are at most 31 characters and cannot contain []:*?/\\."""
+    return re.sub(r"[\[\]:*?/\\]", "-", name)[:31]
+
+
+def _cell_value(value):
+    if isinstance(value, (list, tuple)):
+        return "; ".join(map(str, value))
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _header(sheet, names):
+    cells = []
+    for name in names:
+        cell = WriteOnlyCell(sheet, value=str(name))
+        cell.font = Font(bold=True)
+        cells.append(cell)
+    return cells
+
+
+def _chunks(supabase, query):
+    """Rows of a query: the cached result when a view already fetched it, otherwise streamed a page at a time."""
+    cached = query_cache.get(query)
+    if cached is not None:
+        yield cached
+        return
+    yield from iter_table(supabase, query)
+
+
+def _write_rows(workbook, title, chunks):
+    """Append every chunk to a new sheet as it arrives; returns the number of rows written."""
+    sheet = workbook.create_sheet(_sheet_title(title))
+    columns, rows = None, 0
+    for chunk in chunks:
+        if columns is None:
+            columns = list(chunk.columns)
+            sheet.append(_header(sheet, columns))
+        for row in chunk.reindex(columns=columns).itertuples(index=False, name=None):
+            sheet.append([_cell_value(value) for value in row])
+        rows += len(chunk)
+    if columns is None:
+        sheet.append(["No rows"])
+    return rows
+
+
+def _write_collation(workbook, supabase, year_range):
+    sheet = workbook.create_sheet("Collation")
+    matrix, is_sum, warnings, fetch_errors = full_range_matrix(supabase)
+    if fetch_errors:
+        raise RuntimeError("; ".join(f"{table}: {message}" for table, message in fetch_errors.items()))
+    if matrix.empty:
+        sheet.append(["No data available for collation."])
+        return
+    collated = slice_years(matrix, is_sum, year_range)
+    sheet.append(_header(sheet, collated.columns))
+    year_columns = [column not in ROW_COLUMNS for column in collated.columns]
+    for row in collated.itertuples(index=False, name=None):
+        cells = []
+        for value, is_year in zip(row, year_columns):
+            cell = WriteOnlyCell(sheet, value=_cell_value(value))
+            if is_year:
+                cell.number_format = NUMBER_FORMAT
+            cells.append(cell)
+        sheet.append(cells)
+    if warnings:
+        notes = workbook.create_sheet("Collation notes")
+        for warning in warnings:
+            notes.append([warning])
+
+
+def build_workbook(supabase, year_range):
+    """Write the collation matrix, each category's validated rows and its pending queue to XLSX bytes.
+
+    The workbook is write-only: rows are streamed to disk as they are appended,
+    and raw tables are read a page at a time unless already cached, so memory
+    does not grow with the length of the history exported."""
+    workbook = Workbook(write_only=True)
+    _write_collation(workbook, supabase, year_range)
+    for subcategory in ippu_catalog.CATEGORIES:
+        code = ippu_catalog.category_code(subcategory)
+        _write_rows(workbook, f"{code} validated", _chunks(supabase, ippu_catalog.validated_query(subcategory, year_range)))
+    for subcategory in ippu_catalog.CATEGORIES:
+        code = ippu_catalog.category_code(subcategory)
+        _write_rows(workbook, f"{code} pending", _chunks(supabase, ippu_catalog.pending_query(subcategory)))
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def _export_key(year_range):
+    """An export is current while none of the tables it reads have been written to."""
+    tables = []
+    for category in ippu_catalog.CATEGORIES.values():
+        tables += [category["validated"], category["validation"]]
+    return (tuple(year_range), tuple(query_cache.version(table) for table in tables))
+
+
+def export_future(supabase, year_range, start=False):
+    """Return this session's export future for year_range if still current, starting one when start is set."""
+    key = _export_key(year_range)
+    export = st.session_state.get(EXPORT_STATE_KEY)
+    if export is not None and export[0] == key:
+        return export[1]
+    if not start:
+        return None
+    future = _export_executor.submit(build_workbook, supabase, tuple(year_range))
+    st.session_state[EXPORT_STATE_KEY] = (key, future)
+    return future
+
+
+def render_export(supabase, year_range):
+    """Prepare the XLSX export in the background and offer it for download once written."""
+    future = export_future(supabase, year_range)
+    if future is None:
+        if st.button("Prepare XLSX export", key="ippu_export_start"):
+            future = export_future(supabase, year_range, start=True)
+        else:
+            return
+    if not future.done():
+        st.info("The export is being written; it can be downloaded once it is ready.")
+        st.button("Check again", key="ippu_export_refresh")
+        return
+    error = future.exception()
+    if error is not None:
+        st.error(f"Export failed: {error}")
+        logger.error(f"Workbook export failed: {error}")
+        st.session_state.pop(EXPORT_STATE_KEY, None)
+        return
+    st.download_button(
+        "Download XLSX export",
+        future.result(),
+        file_name=f"ippu_inventory_{year_range[0]}-{year_range[1]}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        key="ippu_export_download"
+    )